@@ -21,8 +21,33 @@ _version = '3.0'
 _para_version = '1.0'
 _horn_version = '2.5'
 
+import collections
+import concurrent.futures
+import copy
+import functools
+import mmap
+import multiprocessing
+import os
+import queue
+import threading
+
 from . import morpho
 
+# Maximum number of word analyses to memoize (in each cache)
+ANAL_CACHE_SIZE = 50000
+# Size of the output buffer for analysis files
+OUT_BUFFER_SIZE = 1 << 20
+# Maximum number of files read ahead of the one being analyzed
+READ_AHEAD = 4
+# Extension for files of pickled cascades
+CASC_CACHE_EXT = '.fstcache'
+# Directory for the user's cached files, such as pickled cascades
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or
+                         os.path.join(os.path.expanduser('~'), '.cache'),
+                         'hornmorpho')
+# Cached files made by other versions are ignored
+CACHE_VERSION = '{}-{}'.format(_version, _horn_version)
+
 print('\n>>>>> This is L3Morpho, version {} <<<<<'.format(_version))
 # print(  '>>>>>   and ParaMorfo, version', _para_version, ' <<<<<\n')
 print('>>>>>  and HornMorpho, version {}  <<<<<'.format(_horn_version))
@@ -33,9 +58,185 @@ def load_lang(language, phon=False, segment=False, load_morph=True, verbose=Fals
     @param language: a language label
     @type  language: string
     """
+    clear_caches()
     morpho.load_lang(language, phon=phon, segment=segment, load_morph=load_morph,
                      verbose=verbose)
 
+def clear_caches():
+    """Empty the caches of memoized word analyses, for example, after
+    a language has been (re)loaded."""
+    _resolve_lang_cached.cache_clear()
+    _word_cache.clear()
+    _form_cache.clear()
+    _gen_pos_cache.clear()
+    _phon_word_cached.cache_clear()
+    morpho.semiring.PARSED_FSS.clear()
+    morpho.fst.INIT_WEIGHTS.clear()
+    for key in CACHE_STATS:
+        CACHE_STATS[key] = 0
+
+def cache_stats():
+    """Return the numbers of analyses found in the word cache and the form cache
+    and the number of words that had to be analyzed since the caches were cleared,
+    for example, to decide on a value for ANAL_CACHE_SIZE."""
+    return dict(CACHE_STATS)
+
+@functools.lru_cache(maxsize=16)
+def _resolve_lang_cached(abbrev, phon=False, segment=False):
+    language = morpho.get_language(abbrev, phon=phon, segment=segment)
+    if not language:
+        # Don't remember failures; the language may be loadable later
+        raise LookupError(abbrev)
+    return language
+
+def _resolve_lang(abbrev, phon=False, segment=False):
+    """Get the Language object for abbrev, remembering it so that later calls
+    with the same arguments skip morpho.get_language; None if there is no such language."""
+    try:
+        return _resolve_lang_cached(abbrev, phon=phon, segment=segment)
+    except LookupError:
+        return None
+
+# Memoized analyses, least recently used first: one cache for words exactly as
+# they appear and one for their (preprocessed) forms, shared by words with the same
+# romanization
+_word_cache = collections.OrderedDict()
+_form_cache = collections.OrderedDict()
+# The POS that generated each word requested without a POS, or '' if none did
+_gen_pos_cache = collections.OrderedDict()
+# Hits in the two caches and misses
+CACHE_STATS = {'word': 0, 'form': 0, 'miss': 0}
+
+def _cache_get(cache, key):
+    """The value stored in the LRU cache for key, or None."""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+def _cache_put(cache, key, value):
+    """Store value in the LRU cache, discarding the least recently used item
+    if there are more than ANAL_CACHE_SIZE."""
+    cache[key] = value
+    while len(cache) > ANAL_CACHE_SIZE:
+        cache.popitem(last=False)
+
+def _anal_word_cached(language, word, preproc=True, postproc=True,
+                      root=True, citation=True, gram=True, segment=False,
+                      only_guess=False, guess=True, nbest=100, raw=False):
+    """Analyze a word with a Language object, without printing anything out;
+    the analyses are stored so that repeated words are only analyzed once."""
+    options = (postproc, root, citation, gram, segment, only_guess, guess, nbest, raw)
+    key = (language, word, preproc) + options
+    analyses = _cache_get(_word_cache, key)
+    if analyses is not None:
+        CACHE_STATS['word'] += 1
+        return analyses
+    # The analyses depend only on the preprocessed form of the word
+    form = language.preproc(word) if preproc and language.preproc else word
+    form_key = (language, form) + options
+    analyses = _cache_get(_form_cache, form_key)
+    if analyses is not None:
+        CACHE_STATS['form'] += 1
+    else:
+        CACHE_STATS['miss'] += 1
+        analyses = language.anal_word(form, preproc=False, postproc=postproc,
+                                      root=root, citation=citation, gram=gram,
+                                      segment=segment, only_guess=only_guess,
+                                      guess=guess, nbest=nbest,
+                                      string=not raw, print_out=False)
+        _cache_put(_form_cache, form_key, analyses)
+    _cache_put(_word_cache, key, analyses)
+    return analyses
+
+@functools.lru_cache(maxsize=ANAL_CACHE_SIZE)
+def _phon_word_cached(language, word, gram=False, postproc=False,
+                      rank=True, nbest=100, freq=True):
+    """Raw phonetic conversion of a word with a Language object, memoized."""
+    return language.ortho2phon(word, gram=gram, raw=True, return_string=False,
+                               report_freq=freq, nbest=nbest,
+                               postpostproc=postproc, rank=rank)
+
+def _anal_word(language, word, preproc=True, postproc=True,
+               root=True, citation=True, gram=True, segment=False,
+               only_guess=False, guess=True, nbest=100, raw=False):
+    """Memoized analysis of word; prints out the analyses unless raw is True,
+    otherwise returns a copy of them, so callers can't alter the cached list."""
+    analyses = _anal_word_cached(language, word, preproc=preproc, postproc=postproc,
+                                 root=root, citation=citation, gram=gram,
+                                 segment=segment, only_guess=only_guess,
+                                 guess=guess, nbest=nbest, raw=raw)
+    if not raw:
+        print(language.analyses2string(word, analyses, form_only=segment and not gram))
+    return copy.copy(analyses)
+
+# _anal_word with preproc and postproc bound, indexed by (preproc << 1) | postproc
+_MODES = tuple([functools.partial(_anal_word, preproc=bool(mode >> 1), postproc=bool(mode & 1))
+                for mode in range(4)])
+
+def _seg_raw(analysis):
+    print('Analysis', analysis)
+    return analysis
+
+def _seg_raw_gram(analysis):
+    print('Analysis', analysis)
+    return [(anal[1], anal[-1]) for anal in analysis]
+
+# What seg_word() returns, indexed by (raw << 1) | gram
+_SEG_POSTPROCESSORS = (lambda analysis: None, lambda analysis: None,
+                       _seg_raw, _seg_raw_gram)
+
+# _anal_word with the options that anal_word() uses by default
+_anal_word_default = functools.partial(_anal_word, preproc=True, postproc=True,
+                                       root=True, citation=True, gram=True, segment=False,
+                                       only_guess=False, guess=True, nbest=100, raw=False)
+
+def _read_text_mmap(path):
+    """Return the text of the file at path, decoded straight from a memory map
+    of the file rather than read line by line."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if not os.fstat(fd).st_size:
+            # An empty file can't be mapped
+            return ''
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8')
+    finally:
+        os.close(fd)
+
+def _read_files(paths, files):
+    """Read each of the files in paths, putting (path, contents) pairs on the
+    queue files, followed by None; contents is None if the file can't be read."""
+    for path in paths:
+        try:
+            with open(path, 'rb') as file:
+                contents = file.read()
+        except IOError:
+            contents = None
+        files.put((path, contents))
+    files.put(None)
+
+def _anal_words(language, words, infile, outfile=None, segment=False, **kwargs):
+    """Analyze words, the words in infile with punctuation already separated,
+    with language.anal_iter, buffering the output."""
+    print('Segmenting words in' if segment else 'Analyzing words in', infile)
+    if outfile:
+        print('Writing to', outfile)
+        with open(outfile, 'w', encoding='utf-8', buffering=OUT_BUFFER_SIZE) as out:
+            language.anal_iter(words, out=out, segment=segment, tokenized=True, **kwargs)
+    else:
+        language.anal_iter(words, segment=segment, tokenized=True, **kwargs)
+
+def _anal_file_mmap(language, infile, outfile=None, segment=False, **kwargs):
+    """Analyze the words in infile with language.anal_iter, reading the whole file
+    through a memory map, tokenizing it in one pass and buffering the output."""
+    try:
+        words = language.morphology.tokenize(_read_text_mmap(infile))
+        _anal_words(language, words, infile, outfile,
+                    segment=segment, **kwargs)
+    except IOError:
+        print('No such file or path; try another one.')
+
 def seg_word(language, word, root=False, citation=False, gram=False,
              roman=False, raw=False):
     '''Segment a single word and print out the results.
@@ -57,20 +258,14 @@ def seg_word(language, word, root=False, citation=False, gram=False,
     @return:         a list of analyses (only if raw is True)
     @rtype:          list of (root, feature structure) pairs
     '''
-    language = morpho.get_language(language, phon=False, segment=True)
+    language = _resolve_lang(language, phon=False, segment=True)
     if language:
-        analysis = language.anal_word(word, preproc=not roman,
-                                      postproc=not roman and not raw,
-                                      root=root, citation=citation, gram=gram,
-                                      segment=True, only_guess=False,
-                                      print_out=not raw,
-                                      string=not raw)
-        if raw:
-            print('Analysis', analysis)
-            if gram:
-                return [(anal[1], anal[-1]) for anal in analysis]
-            else:
-                return analysis
+        raw = bool(raw)
+        non_roman = not roman
+        analysis = _MODES[(non_roman << 1) | (non_roman and not raw)](
+            language, word, root=root, citation=citation, gram=gram,
+            segment=True, only_guess=False, raw=raw)
+        return _SEG_POSTPROCESSORS[(raw << 1) | bool(gram)](analysis)
 
 seg = seg_word
 
@@ -97,12 +292,17 @@ def seg_file(language, infile, outfile=None, root=False, citation=False, gram=Fa
     @param nlines:   number of lines to analyze (if not 0)
     @type  nlines:   int
     '''
-    language = morpho.get_language(language, phon=False, segment=True)
+    language = _resolve_lang(language, phon=False, segment=True)
     if language:
-        language.anal_file(infile, outfile, root=root, citation=citation, gram=gram,
-                           pos=None, preproc=preproc, postproc=postproc,
-                           segment=True, only_guess=False, guess=False,
-                           start=start, nlines=nlines)
+        if start or nlines:
+            language.anal_file(infile, outfile, root=root, citation=citation, gram=gram,
+                               pos=None, preproc=preproc, postproc=postproc,
+                               segment=True, only_guess=False, guess=False,
+                               start=start, nlines=nlines)
+        else:
+            _anal_file_mmap(language, infile, outfile, root=root, citation=citation, gram=gram,
+                            pos=None, preproc=preproc, postproc=postproc,
+                            segment=True, only_guess=False, guess=False)
 
 def anal_word(language, word, root=True, citation=True, gram=True,
               non_roman=True, roman=False, segment=False, guess=False,
@@ -145,15 +345,19 @@ def anal_word(language, word, root=True, citation=True, gram=True,
     @return:         a list of analyses (only if raw is True)
     @rtype:          list of (root, feature structure) pairs
     '''
-    language = morpho.get_language(language, phon=False, segment=segment)
+    language = _resolve_lang(language, phon=False, segment=segment)
     if language:
-        analysis = language.anal_word(word, preproc=non_roman and not roman,
-                                      postproc=(non_roman and not roman) and not raw,
-                                      root=root, citation=citation, gram=gram,
-                                      segment=segment, only_guess=guess,
-                                      guess=not dont_guess,
-                                      nbest=nbest,
-                                      string=not raw, print_out=not raw)
+        if root and citation and gram and non_roman and nbest == 100 and \
+           not (roman or segment or guess or dont_guess or raw):
+            # All the defaults
+            _anal_word_default(language, word)
+            return
+        raw = bool(raw)
+        non_roman = bool(non_roman) and not roman
+        analysis = _MODES[(non_roman << 1) | (non_roman and not raw)](
+            language, word, root=root, citation=citation, gram=gram,
+            segment=segment, only_guess=guess, guess=not dont_guess,
+            nbest=nbest, raw=raw)
         if raw:
             return analysis
 #        if raw:
@@ -161,31 +365,83 @@ def anal_word(language, word, root=True, citation=True, gram=True,
 
 anal = anal_word
 
+def _init_worker(lang_abbrev):
+    """Load the language once in each worker process (already done if the
+    worker was forked from a process that had loaded it)."""
+    _resolve_lang(lang_abbrev)
+
+def _worker_context(fork=False):
+    """Start workers by spawning new processes, each of which loads the language,
+    or, if fork and the platform allows it, by forking, so that they share the
+    language already loaded in this process (unsafe if other threads are running)."""
+    if fork and 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context('spawn')
+
+def _anal_one_file(lang_abbrev, infile, outfile, kwargs):
+    """Analyze one file in a worker process, returning the analyses saved
+    while doing it."""
+    saved = {}
+    language = _resolve_lang(lang_abbrev)
+    if language:
+        _anal_file_mmap(language, infile, outfile, saved=saved, **kwargs)
+    return saved
+
 def anal_files(language, infiles, outsuff='.out',
                root=True, citation=True, gram=True,
                preproc=True, postproc=True, guess=False, raw=False,
-               dont_guess=False, rank=True, freq=True, nbest=100):
+               dont_guess=False, rank=True, freq=True, nbest=100,
+               saved=None, processes=1, fork=False):
     """Analyze the words in a set of files, writing the analyses to
     files whose names are the infile names with outpre prefixed to them.
+    If processes is greater than 1, the files are analyzed in parallel in
+    that many separate processes, and the analyses saved in each that
+    aren't already in saved are added to it. If fork, the worker processes
+    are forked from this one rather than each loading the language.
     See anal_file for description of parameters."""
-    language = morpho.get_language(language)
+    lang_abbrev = language
+    language = _resolve_lang(language)
     if language:
         # Dict for saving analyses
-        saved = {}
-        for infile in infiles:
-            outfile = infile + outsuff
-            language.anal_file(infile, outfile, root=root, citation=citation, gram=gram,
-                               pos=None, preproc=preproc, postproc=postproc,
-                               nbest=nbest,
-                               only_guess=guess, guess=not dont_guess,
-                               raw=raw, saved=saved)
+        if saved is None:
+            saved = {}
+        kwargs = dict(root=root, citation=citation, gram=gram,
+                      pos=None, preproc=preproc, postproc=postproc,
+                      nbest=nbest,
+                      only_guess=guess, guess=not dont_guess,
+                      raw=raw)
+        if len(infiles) < 2 or not processes or processes <= 1:
+            # Read the next files in another thread while analyzing this one
+            files = queue.Queue(maxsize=READ_AHEAD)
+            threading.Thread(target=_read_files, args=(infiles, files), daemon=True).start()
+            for infile, contents in iter(files.get, None):
+                if contents is None:
+                    print('No such file or path; try another one.')
+                    continue
+                words = language.morphology.tokenize(contents.decode('utf-8'))
+                try:
+                    _anal_words(language, words, infile, infile + outsuff, saved=saved, **kwargs)
+                except IOError:
+                    print('No such file or path; try another one.')
+            return
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(processes, len(infiles)),
+                                                    mp_context=_worker_context(fork),
+                                                    initializer=_init_worker,
+                                                    initargs=(lang_abbrev,)) as executor:
+            futures = [executor.submit(_anal_one_file, lang_abbrev, infile, infile + outsuff,
+                                       kwargs)
+                       for infile in infiles]
+            for future in futures:
+                for word, analyses in future.result().items():
+                    if word not in saved:
+                        saved[word] = analyses
 
 def anal_file(language, infile, outfile=None,
               root=True, citation=True, gram=True,
               preproc=True, postproc=True, guess=False, raw=False,
               dont_guess=False,
               rank=True, freq=True, nbest=100,
-              start=0, nlines=0):
+              start=0, nlines=0, saved=None):
     '''Analyze the words in a file, writing the analyses to outfile.
 
     @param infile:   path to a file to read the words from
@@ -216,15 +472,24 @@ def anal_file(language, infile, outfile=None,
     @type  start:    int
     @param nlines:   number of lines to analyze (if not 0)
     @type  nlines:   int
+    @param saved:    analyses of words already seen, shared across calls
+    @type  saved:    dict
     '''
-    language = morpho.get_language(language)
+    language = _resolve_lang(language)
     if language:
-        language.anal_file(infile, outfile, root=root, citation=citation, gram=gram,
-                           pos=None, preproc=preproc, postproc=postproc,
-                           only_guess=guess, guess=not dont_guess,
-                           raw=raw,
-                           nbest=nbest,
-                           start=start, nlines=nlines)
+        if start or nlines:
+            language.anal_file(infile, outfile, root=root, citation=citation, gram=gram,
+                               pos=None, preproc=preproc, postproc=postproc,
+                               only_guess=guess, guess=not dont_guess,
+                               raw=raw,
+                               nbest=nbest, saved=saved,
+                               start=start, nlines=nlines)
+        else:
+            _anal_file_mmap(language, infile, outfile, root=root, citation=citation, gram=gram,
+                            pos=None, preproc=preproc, postproc=postproc,
+                            only_guess=guess, guess=not dont_guess,
+                            raw=raw,
+                            nbest=nbest, saved=saved)
 
 ##def anal_gui(language, infile, outfile=None):
 ##    '''Open a window for reading in a file where words can be clicked for analysis.'''
@@ -251,7 +516,7 @@ def gen(language, root, features=[], pos=None, guess=False, phon=False,
     @param non_roman: whether the language uses a non-roman script
     @type  non_roman: boolean
     '''
-    language = morpho.get_language(language, segment=False, phon=phon)
+    language = _resolve_lang(language, segment=False, phon=phon)
     if language:
         is_not_roman = not roman and non_roman
         morf = language.morphology
@@ -263,12 +528,26 @@ def gen(language, root, features=[], pos=None, guess=False, phon=False,
                 print(output[0][0])
                 return
         else:
-            for posmorph in list(morf.values()):
+            posmorphs = morf.values_tuple()
+            # Unless some POS asks the user for features, the same request
+            # always succeeds with the same POS, so go straight to that one
+            key = None
+            if not any(posmorph.feat_list for posmorph in posmorphs):
+                key = (language, root, str(features), guess, is_not_roman)
+                known = _cache_get(_gen_pos_cache, key)
+                if known is not None:
+                    posmorphs = (morf[known],) if known else ()
+            for posmorph in posmorphs:
                 output = posmorph.gen(root, update_feats=features,
                                       postproc=is_not_roman, guess=guess)
                 if output:
+                    if key:
+                        _cache_put(_gen_pos_cache, key, posmorph.pos)
                     print(output[0][0])
                     return
+            if key:
+                # No POS can generate it ('' rather than None, which means unknown)
+                _cache_put(_gen_pos_cache, key, '')
         print("This word can't be generated!")
 
 def phon_word(lang_abbrev, word, gram=False, raw=False,
@@ -291,8 +570,11 @@ def phon_word(lang_abbrev, word, gram=False, raw=False,
     @return:         a list of analyses
     @rtype:          list of (root, feature structure) pairs
     '''
-    language = morpho.get_language(lang_abbrev, phon=True, segment=False)
+    language = _resolve_lang(lang_abbrev, phon=True, segment=False)
     if language:
+        if raw:
+            return copy.copy(_phon_word_cached(language, word, gram=gram, postproc=postproc,
+                                               rank=rank, nbest=nbest, freq=freq))
         return language.ortho2phon(word, gram=gram, raw=raw, return_string=False,
                                    report_freq=freq, nbest=nbest,
                                    postpostproc=postproc, rank=rank)
@@ -331,13 +613,30 @@ def phon_file(lang_abbrev, infile, outfile=None, gram=False,
     @param nlines:   number of lines to analyze (if not 0)
     @type  nlines:   int
     '''
-    language = morpho.get_language(lang_abbrev, phon=True, segment=False)
+    language = _resolve_lang(lang_abbrev, phon=True, segment=False)
     if language:
-        language.ortho2phon_file(infile, outfile=outfile, gram=gram,
-                                 word_sep=word_sep, anal_sep=anal_sep, print_ortho=print_ortho,
-                                 postpostproc=postproc, rank=rank, nbest=nbest,
-                                 report_freq=freq,
-                                 start=start, nlines=nlines)
+        if start or nlines:
+            language.ortho2phon_file(infile, outfile=outfile, gram=gram,
+                                     word_sep=word_sep, anal_sep=anal_sep, print_ortho=print_ortho,
+                                     postpostproc=postproc, rank=rank, nbest=nbest,
+                                     report_freq=freq,
+                                     start=start, nlines=nlines)
+            return
+        try:
+            words = language.morphology.tokenize(_read_text_mmap(infile))
+            print('Analyzing words in', infile)
+            kwargs = dict(gram=gram,
+                          word_sep=word_sep, anal_sep=anal_sep, print_ortho=print_ortho,
+                          postpostproc=postproc, rank=rank, nbest=nbest,
+                          report_freq=freq, tokenized=True)
+            if outfile:
+                print('Writing analysis to', outfile)
+                with open(outfile, 'w', encoding='utf-8', buffering=OUT_BUFFER_SIZE) as out:
+                    language.ortho2phon_iter(words, out=out, **kwargs)
+            else:
+                language.ortho2phon_iter(words, **kwargs)
+        except IOError:
+            print('No such file or path; try another one.')
 
 def get_features(language, pos=None):
     '''Return a dict of features and their possible values for each pos.
@@ -353,16 +652,16 @@ def get_features(language, pos=None):
     @rtype:           dictionary of feature (string): possible values (list)
                       pairs or list of (pos, dictionary) pairs
     '''
-    language = morpho.get_language(language)
+    language = _resolve_lang(language)
     if language:
         morf = language.morphology
         if pos:
             return morf[pos].get_features()
         elif len(morf) == 1:
-            return list(morf.values())[0].get_features()
+            return morf.values_tuple()[0].get_features()
         else:
             feats = []
-            for pos, posmorph in list(morf.items()):
+            for pos, posmorph in morf.items_tuple():
                 feats.append((pos, posmorph.get_features()))
             return feats
 
@@ -396,14 +695,31 @@ def cascade(language, pos, gen=False, phon=False, segment=False,
             casc_inv = pos.casc.inverted()
             pos.casc_inv = casc_inv
             return casc_inv
+    # Try the cascade saved by recompile() if its sources haven't changed since
+    cached = morpho.FSTCascade.load_cache(_casc_cache_path(pos, gen=gen, phon=phon, segment=segment),
+                                          language=pos.language, version=CACHE_VERSION,
+                                          verbose=verbose)
+    if not cached and gen:
+        # The analysis cascade is saved together with its inverse
+        cached = morpho.FSTCascade.load_cache(_casc_cache_path(pos, phon=phon, segment=segment),
+                                              language=pos.language, version=CACHE_VERSION,
+                                              verbose=verbose)
+    if cached:
+        casc, casc_inv = cached
+        pos.casc = casc
+        pos.casc_inv = casc_inv or casc.inverted()
+        # Analyses made with the old cascade are out of date
+        clear_caches()
+        return pos.casc_inv if gen else pos.casc
     pos.load_fst(True, create_fst=False, generate=gen, invert=gen, gen=gen,
                  segment=segment, verbose=verbose)
+    clear_caches()
     if gen:
         return pos.casc_inv
     return pos.casc
 
 def recompile(language, pos, phon=False, segment=False, gen=False, backwards=False,
-              save=True, verbose=True):
+              save=True, minimal=False, verbose=True):
     '''Recompiles the cascade FST for the language and part-of-speech.
     @param language: abbreviation for a language, for example, 'gn'
     @type  language: string
@@ -420,6 +736,8 @@ def recompile(language, pos, phon=False, segment=False, gen=False, backwards=Fal
     @type  backwards: boolean
     @param save:   whether to save the compiled cascade as an FST file
     @type  save:   boolean
+    @param minimal: whether to minimize the FSTs created from lexicons
+    @type  minimal: boolean
     @param verbose: whether to print out various messages
     @type  verbose: boolean
     @return:       the POS morphology object
@@ -428,7 +746,7 @@ def recompile(language, pos, phon=False, segment=False, gen=False, backwards=Fal
     pos_morph = get_pos(language, pos, phon=phon, segment=segment, load_morph=False, verbose=verbose)
     fst = pos_morph.load_fst(True, segment=segment, generate=gen, invert=gen,
                              compose_backwards=backwards,
-                             phon=phon, verbose=verbose)
+                             phon=phon, minimal=minimal, verbose=verbose)
     if not fst and gen == True:
         # Load analysis FST
         pos_morph.load_fst(True, verbose=True)
@@ -436,8 +754,35 @@ def recompile(language, pos, phon=False, segment=False, gen=False, backwards=Fal
         pos_morph.load_fst(generate=True, invert=True, gen=True, verbose=verbose)
     if save:
         pos_morph.save_fst(generate=gen, segment=segment, phon=phon)
+        if pos_morph.casc:
+            # Make the FSTs' arc tables and parse their weights now so that
+            # they are saved with them; identical weights are shared across the cascade
+            weights = {}
+            for fst in pos_morph.casc:
+                if isinstance(fst, morpho.FST):
+                    fst.make_arc_tables()
+                    fst.intern_weights(weights)
+            # The inverted cascade is saved too, so that cascade() needn't invert it for generation
+            if not pos_morph.casc_inv:
+                pos_morph.casc_inv = pos_morph.casc.inverted()
+            for fst in pos_morph.casc_inv:
+                if isinstance(fst, morpho.FST):
+                    fst.make_arc_tables()
+                    fst.intern_weights(weights)
+            # Save the whole cascade and its inverse, so that cascade() needn't rebuild them
+            path = _casc_cache_path(pos_morph, gen=gen, phon=phon, segment=segment)
+            if not pos_morph.casc.save_cache(path, inverted=pos_morph.casc_inv, version=CACHE_VERSION):
+                if verbose:
+                    print("Couldn't save cascade in", path)
+    # Analyses and generated forms made with the old FSTs are out of date
+    clear_caches()
     return pos_morph
 
+def _casc_cache_path(pos_morph, gen=False, phon=False, segment=False):
+    """Path to the file in the user's cache directory where the cascade for the POS is pickled."""
+    name = pos_morph.fst_name(generate=gen, phon=phon, segment=segment)
+    return os.path.join(CACHE_DIR, pos_morph.language.abbrev, name + CASC_CACHE_EXT)
+
 def test_fst(language, pos, string, gen=False, phon=False, segment=False,
              fst_label='', fst_index=0):
     """Test a individual FST within a cascade, identified by its label or its index,
@@ -32,9 +32,10 @@ Modified by Michael Gasser <gasser@cs.indiana.edu>
     now returns 'fail' rather than None when it fails
 """    
 
-import re, copy
+import re, copy, sys, functools
 from .logic import Variable, Expression, SubstituteBindingsI, LogicParser
 from . import internals
+from .utils import some
 
 #////////////////////////////////////////////////////////////
 #{ Types and inheritance
@@ -60,28 +61,42 @@ class FSHier(dict):
         for label, tp in labels_types:
             fs = FeatStruct(tp, label=label, fsh=self)
             self.add(label, fs)
+        self.specialize()
+
+    def specialize(self, labels=None):
+        """
+        Work out in advance how each frozen type in the hierarchy is
+        inherited from, so that inherit() doesn't have to each time.
+        @param labels: Labels of the types to specialize; all by default.
+        """
+        for label in (labels or list(self.keys())):
+            fs = self[label]
+            # Ancestors are frozen once they're the types of other FSs
+            for tp in [fs] + list(fs.get_all_types()):
+                if tp._frozen:
+                    _inherit_plan(tp)
 
 def is_anc(anc, child):
     """Is anc an ancestor in the FS hierarchy of child?"""
     if anc in child._types:
         return True
+    elif child._frozen:
+        # Types are frozen, and frozen FSs remember their ancestors
+        return anc in child.get_all_types()
     else:
         return some(lambda a: is_anc(anc, a), child._types)
 
 def merge_types(types1, types2):
     """Combine the two sets of types, excluding parents of children."""
-    exclude = set()
-    for t1 in types1:
-        for t2 in types2:
-            if t1 == t2 or is_anc(t1, t2):
-                exclude.add(t1)
-    merged = types1 - exclude
-    exclude = set()
+    # Types are frozen, so each remembers its ancestors
+    ancs2 = set()
     for t2 in types2:
-        for t1 in merged:
-            if is_anc(t2, t1):
-                exclude.add(t2)
-    return merged | (types2 - exclude)
+        ancs2.update(t2.get_all_types())
+    merged = set([t1 for t1 in types1 if t1 not in types2 and t1 not in ancs2])
+    ancs1 = set()
+    for t1 in merged:
+        ancs1.update(t1.get_all_types())
+    return merged | set([t2 for t2 in types2 if t2 not in ancs1])
 
 def inherit_all(child, bindings=None, trace=False, indent=0):
     if not isinstance(child, FeatStruct):
@@ -109,17 +124,23 @@ def inherit(child, anc, bindings=None, trace=False, rename_vars=True, indent=0):
     """
     bindings = bindings or {}
 
-    # Make copies of child and anc (since the unification
-    # algorithm is destructive). Do it all at once, to preserve
-    # reentrance links between child and anc.  Copy bindings
-    # as well, in case there are any bound vars that contain parts
-    # of child or anc.
-    (childcopy, anccopy) = (copy.deepcopy((child, anc)))
-
-    if rename_vars:
+    # Make a copy of child (since the unification algorithm is
+    # destructive).  anc is only read (values are copied from it
+    # as they're needed), so it's copied only if its variables
+    # have to be renamed.  Use one memo, to preserve reentrance
+    # links between child and anc.
+    memo = {}
+    childcopy = _fast_clone(child, memo)
+    anccopy = anc
+
+    # Most FSs have no variables; frozen ones remember whether they do
+    if rename_vars and _has_variables(child):
         vars1 = find_variables(childcopy, FeatStruct)
-        vars2 = find_variables(anccopy, FeatStruct)
-        _rename_variables(anccopy, vars1, vars2, {}, FeatStruct, set())
+        # Only variables in child are renamed in anc
+        if vars1:
+            anccopy = _fast_clone(anc, memo)
+            vars2 = find_variables(anccopy, FeatStruct)
+            _rename_variables(anccopy, vars1, vars2, {}, FeatStruct, set())
 
     # Do the actual unification.  If it fails, return None.
     forward = {}
@@ -153,32 +174,69 @@ def _inherit(child, anc, bindings, forward, trace, path, indent=0):
     @param trace: If true, generate trace output
     @param path: The feature path that led us to this unification
         step.  Used for trace output.
+
+    Only child is modified; FSs in anc are copied before they become
+    part of child, so anc may be a (frozen) type.
     """
-    for fname in child:
-        if getattr(fname, 'default', None) is not None:
-            anc.setdefault(fname, fname.default)
-    for fname in anc:
-        if getattr(fname, 'default', None) is not None:
-            child.setdefault(fname, fname.default)
+    # Work on the feature dicts directly; only Features (not strings)
+    # have defaults
+    child_features = child._features
+    anc_features = anc._features
+    # Defaults for features of child's that anc doesn't have
+    anc_defaults = [(fname, fname.default) for fname in child_features
+                    if type(fname) is not str and getattr(fname, 'default', None) is not None and \
+                       fname not in anc_features]
+    items, defaults = _inherit_plan(anc)
+    for fname, default in defaults:
+        child_features.setdefault(fname, default)
 
     # Unify any values that are defined in both child and
     # anc.  Copy any values that are defined in anc but
     # not in child to child.  Note: sorting anc's
-    # features isn't actually necessary; but we do it to give
-    # deterministic behavior, e.g. for tracing.
-    for fname, fval2 in sorted(anc.items()):
-        if fname in child:
-            child[fname] = _inherit_feature_values(fname, child[fname], fval2, bindings,
-                                                   forward, trace, path+(fname,), indent=indent)
+    # features isn't actually necessary (insertion order is
+    # deterministic too); but we do it for tracing.
+    if trace:
+        items = sorted(items)
+    if anc_defaults:
+        items = list(items) + anc_defaults
+    # Copies of FSs in anc, sharing a memo to preserve reentrances
+    memo = {}
+    for fname, fval2 in items:
+        if fname in child_features:
+            child_features[fname] = _inherit_feature_values(fname, child_features[fname], fval2, bindings,
+                                                            forward, trace, path+(fname,), indent=indent)
+        elif isinstance(fval2, FeatStruct):
+            if fval2._types:
+                # Copied by inherit()
+                child_features[fname] = inherit_all(fval2, bindings=bindings, trace=trace, indent=indent+2)
+            else:
+                child_features[fname] = _fast_clone(fval2, memo)
         else:
-            child[fname] = inherit_all(fval2, bindings=bindings, trace=trace, indent=indent+2)
+            # Nothing to inherit
+            child_features[fname] = fval2
     if anc._types:
-        # Inherit from any types of ancestor
+        # Inherit from any types of ancestor, which aren't modified
         for tp in anc._types:
-            _inherit(child, copy.deepcopy(tp), bindings, forward, trace, path, indent=indent+2)
+            _inherit(child, tp, bindings, forward, trace, path, indent=indent+2)
 
     return child # Contains the unified value.
 
+def _inherit_plan(anc):
+    """
+    The features of anc, and those of them with defaults, as they're
+    used by _inherit().  A frozen FS (normally a type) can't change,
+    so it works them out only once.
+    """
+    if anc._frozen:
+        try: return anc._inh_plan
+        except AttributeError: pass
+    items = tuple(anc._features.items())
+    defaults = tuple([(fname, fname.default) for fname, fval in items
+                      if type(fname) is not str and getattr(fname, 'default', None) is not None])
+    if anc._frozen:
+        anc._inh_plan = items, defaults
+    return items, defaults
+
 def _inherit_feature_values(fname, fval1, fval2, bindings, forward, trace, fpath, indent=0):
     """
     Attempt to unify C{fval1} and and C{fval2}, and return the
@@ -199,8 +257,9 @@ def _inherit_feature_values(fname, fval1, fval2, bindings, forward, trace, fpath
     if trace: _trace_inherit_start(fpath, fval1, fval2, indent=indent)
 
     # Look up the "canonical" copy of fval1 and fval2
-    while id(fval1) in forward: fval1 = forward[id(fval1)]
-    while id(fval2) in forward: fval2 = forward[id(fval2)]
+    if forward:
+        while id(fval1) in forward: fval1 = forward[id(fval1)]
+        while id(fval2) in forward: fval2 = forward[id(fval2)]
 
     # If fval1 or fval2 is a bound variable, then
     # replace it by the variable's bound value.  This
@@ -221,23 +280,25 @@ def _inherit_feature_values(fname, fval1, fval2, bindings, forward, trace, fpath
     # Case 2: Two unbound variables (create alias)
     elif (isinstance(fval1, Variable) and
           isinstance(fval2, Variable)):
-        if fval1 != fval2: bindings[fval2] = fval1
+        if fval1 != fval2: _bind(bindings, fval2, fval1)
         result = fval1
     
     # Case 3: An unbound variable and a value (bind)
     elif isinstance(fval1, Variable):            # Is this possible
-        result = bindings[fval1] = fval2
+        # fval2 is anc's, so copy it if it's an FS
+        if isinstance(fval2, FeatStruct): fval2 = _fast_clone(fval2)
+        result = _bind(bindings, fval1, fval2)
     elif isinstance(fval2, Variable):
-        result = bindings[fval2] = fval1
+        result = _bind(bindings, fval2, fval1)
 
     # Case 4: A feature structure & a base value or two base values
     else:
         result = fval1
-        if fvar1 is not None: bindings[fvar1] = result
-        if fvar2 is not None: bindings[fvar2] = result
+        if fvar1 is not None: _bind(bindings, fvar1, result)
+        if fvar2 is not None: _bind(bindings, fvar2, result)
 
-    # Normalize the result.
-    if isinstance(result, FeatStruct):
+    # Normalize the result (nothing to do without forward pointers).
+    if forward and isinstance(result, FeatStruct):
         result = _apply_forwards(result, forward, FeatStruct, set())
     
     if trace:
@@ -275,12 +336,206 @@ def _trace_inherit_bindings(path, bindings, indent=0):
         if indent: print(' ' * indent, end=' ')
         print('  '+'|   '*len(path)+'    Bindings: '+bindstr)
 
+def _fast_clone(fs, memo=None):
+    """
+    Copy fs for inheritance, without the overhead of copy.deepcopy().
+    Feature structures are copied (and the copies aren't frozen);
+    other values, which are normally immutable, are shared, except for
+    lists, dicts and sets, which are deep-copied.
+    @param memo: A dictionary mapping ids of feature structures already
+        copied to their copies, so that reentrances are preserved.
+    """
+    if memo is None: memo = {}
+    if id(fs) in memo: return memo[id(fs)]
+    root = memo[id(fs)] = _clone_node(fs)
+    stack = [(fs, root)]
+    while stack:
+        old, new = stack.pop()
+        features = new._features
+        for fname, fval in old._features.items():
+            if isinstance(fval, FeatStruct):
+                fcopy = memo.get(id(fval))
+                if fcopy is None:
+                    fcopy = memo[id(fval)] = _clone_node(fval)
+                    stack.append((fval, fcopy))
+                fval = fcopy
+            elif isinstance(fval, (list, dict, set)):
+                fval = copy.deepcopy(fval, memo)
+            features[fname] = fval
+    return root
+
+def _clone_node(fs):
+    """An unfrozen FS with fs's types, label, and hierarchy, and no features."""
+    cls = _mutable_class(fs)
+    new = cls.__new__(cls)
+    new._frozen = False
+    new._features = {}
+    new._types = fs._types
+    new._label = fs._label
+    new._fsh = fs._fsh
+    return new
+
+def find_variables(fstruct, fs_class='default'):
+    """
+    @return: The set of variables used by this feature structure.
+    @rtype: C{set} of L{Variable}
+    """
+    if fs_class == 'default': fs_class = _mutable_class(fstruct)
+    return _variables(fstruct, set(), fs_class, set())
+
+def _has_variables(fstruct):
+    """Does fstruct contain any variables?  A frozen FS can't change,
+    so it computes this only once."""
+    if fstruct._frozen:
+        try: return fstruct._has_vars
+        except AttributeError: pass
+    result = False
+    visited = set([id(fstruct)])
+    stack = [fstruct]
+    while stack and not result:
+        for fval in stack.pop()._features.values():
+            if isinstance(fval, Variable) or \
+               (isinstance(fval, SubstituteBindingsI) and fval.variables()):
+                result = True
+                break
+            elif isinstance(fval, FeatStruct) and id(fval) not in visited:
+                visited.add(id(fval))
+                stack.append(fval)
+    if fstruct._frozen:
+        fstruct._has_vars = result
+    return result
+
+def _variables(fstruct, vars, fs_class, visited):
+    # Visit each node only once:
+    if id(fstruct) in visited: return
+    visited.add(id(fstruct))
+    for (fname, fval) in list(fstruct.items()):
+        if isinstance(fval, Variable):
+            vars.add(fval)
+        elif isinstance(fval, fs_class):
+            _variables(fval, vars, fs_class, visited)
+        elif isinstance(fval, SubstituteBindingsI):
+            vars.update(fval.variables())
+    return vars
+
+def _rename_variables(fstruct, vars, used_vars, new_vars, fs_class, visited):
+    if id(fstruct) in visited: return
+    visited.add(id(fstruct))
+    for (fname, fval) in list(fstruct.items()):
+        if isinstance(fval, Variable):
+            # If it's in new_vars, then rebind it.
+            if fval in new_vars:
+                fstruct[fname] = new_vars[fval]
+            # If it's in vars, pick a new name for it.
+            elif fval in vars:
+                new_vars[fval] = _rename_variable(fval, used_vars)
+                fstruct[fname] = new_vars[fval]
+                used_vars.add(new_vars[fval])
+        elif isinstance(fval, fs_class):
+            _rename_variables(fval, vars, used_vars, new_vars,
+                              fs_class, visited)
+        elif isinstance(fval, SubstituteBindingsI):
+            # Pick new names for any variables in `vars`
+            for var in fval.variables():
+                if var in vars and var not in new_vars:
+                    new_vars[var] = _rename_variable(var, used_vars)
+                    used_vars.add(new_vars[var])
+            # Replace all variables in `new_vars`.
+            fstruct[fname] = fval.substitute_bindings(new_vars)
+    return fstruct
+
+def _rename_variable(var, used_vars):
+    name, n = re.sub(r'\d+$', '', var.name), 2
+    if not name: name = '?'
+    while Variable('%s%s' % (name, n)) in used_vars: n += 1
+    return Variable('%s%s' % (name, n))
+
+def _apply_forwards(fstruct, forward, fs_class, visited):
+    """
+    Replace any feature structure that has a forward pointer with
+    the target of its forward pointer (to preserve reentrancy).
+    """
+    # Follow our own forward pointers (if any)
+    while id(fstruct) in forward: fstruct = forward[id(fstruct)]
+
+    # Visit each node only once:
+    if id(fstruct) in visited: return
+    visited.add(id(fstruct))
+
+    for fname, fval in list(fstruct.items()):
+        if isinstance(fval, fs_class):
+            # Replace w/ forwarded value.
+            while id(fval) in forward:
+                fval = forward[id(fval)]
+            fstruct[fname] = fval
+            # Recurse to child.
+            _apply_forwards(fval, forward, fs_class, visited)
+
+    return fstruct
+
+def _bind(bindings, var, value):
+    """
+    Bind var to value, or to what value is bound to if it's a bound
+    variable, so that alias chains stay one link long.
+    @return: The value var is bound to.
+    """
+    while isinstance(value, Variable) and value in bindings:
+        value = bindings[value]
+    bindings[var] = value
+    return value
+
+def _resolve_aliases(bindings):
+    """
+    Replace any bound aliased vars with their binding; and replace
+    any unbound aliased vars with their representative var.
+    """
+    for (var, value) in list(bindings.items()):
+        while isinstance(value, Variable) and value in bindings:
+            value = bindings[var] = bindings[value]
+
+def _substitute_bindings(fstruct, bindings, fs_class, visited):
+    # Visit each node only once:
+    if id(fstruct) in visited: return
+    visited.add(id(fstruct))
+
+    for (fname, fval) in list(fstruct.items()):
+        while (isinstance(fval, Variable) and fval in bindings):
+            fval = fstruct[fname] = bindings[fval]
+        if isinstance(fval, fs_class):
+            _substitute_bindings(fval, bindings, fs_class, visited)
+        elif isinstance(fval, SubstituteBindingsI):
+            fstruct[fname] = fval.substitute_bindings(bindings)
+
+def _trace_valrepr(val):
+    if isinstance(val, Variable):
+        return '%s' % val
+    else:
+        return '%r' % val
+
 ######################################################################
 # Feature Structure
 ######################################################################
 
+# Marks a missing value, where None could be a value
+_MISSING = object()
+
+# Strings of spaces for indenting and padding the lines of FSs
+_SPACES = [' ' * n for n in range(64)]
+
+def _spaces(n):
+    return _SPACES[n] if n < 64 else ' ' * n
+
+# What simple_unify() returns on failure.  Callers elsewhere compare
+# results with 'fail', so it's that string, but it's the only failure
+# value, so it can be checked for with is.
+_FAIL = sys.intern('fail')
+
 class FeatStruct:
 
+    # No per-instance dict; there are very many of these
+    __slots__ = ('_frozen', '_features', '_types', '_label', '_fsh', '__hash', '_all_types', '_has_vars',
+                 '_inh_plan', '_str_lines')
+
     def __init__(self, features=None, types=None, fsh=None, label='', **morefeatures):
         """
         Create a new feature structure, with the specified features.
@@ -297,7 +552,8 @@ class FeatStruct:
         self._frozen = False
         self._features = {}
         #{ Added by MG
-        self._types = types or set()
+        # A frozenset, so copies can share it
+        self._types = frozenset(types) if types else frozenset()
         self._label = label
         # FS Hierarchy
         self._fsh = fsh
@@ -322,14 +578,28 @@ class FeatStruct:
 
     def add_type(self, tp):
         tp.freeze()
-        self._types.add(tp)
+        self._types = self._types | {tp}
 
     def get_all_types(self):
-        """A list of all type ancestors of self."""
-        if not self._types:
-            return set()
-        else:
-            return self._types | reduce_sets([t.get_all_types() for t in self._types])
+        """A list of all type ancestors of self.
+        A frozen FS's types can't change, so it computes them only once."""
+        if self._frozen:
+            try: return self._all_types
+            except AttributeError:
+                self._all_types = frozenset(self._get_all_types())
+                return self._all_types
+        return self._get_all_types()
+
+    def _get_all_types(self):
+        all_types = set()
+        stack = list(self._types)
+        while stack:
+            tp = stack.pop()
+            if tp in all_types:
+                continue
+            all_types.add(tp)
+            stack.extend(tp._types)
+        return all_types
 
     def inherit(self, trace=False):
         """Inherit features from all ancestors."""
@@ -357,6 +627,11 @@ class FeatStruct:
     def __getitem__(self, name_or_path):
         """If the feature with the given name or path exists, return
         its value; otherwise, raise C{KeyError}."""
+        # Almost all feature names are strings
+        if type(name_or_path) is str:
+            value = self._features.get(name_or_path, _MISSING)
+            if value is _MISSING: raise KeyError(name_or_path)
+            return value
         if isinstance(name_or_path, self._feature_name_types):
             return self._features[name_or_path]
         if name_or_path == ():
@@ -370,12 +645,16 @@ class FeatStruct:
     def get(self, name_or_path, default=None):
         """If the feature with the given name or path exists, return its
         value; otherwise, return C{default}."""
+        if type(name_or_path) is str:
+            return self._features.get(name_or_path, default)
         try:
             return self[name_or_path]
         except KeyError:
             return default
     def __contains__(self, name_or_path):
         """Return true if a feature with the given name or path exists."""
+        if type(name_or_path) is str:
+            return name_or_path in self._features
         try:
             self[name_or_path]; return True
         except KeyError:
@@ -407,8 +686,8 @@ class FeatStruct:
     def __delitem__(self, name_or_path):
         """If the feature with the given name or path exists, delete
         its value; otherwise, raise C{KeyError}."""
-        if self._frozen: raise ValueError(self._FROZEN_ERROR)
-        if isinstance(name_or_path, self._feature_name_types):
+        if type(self) is not FeatStruct and self._frozen: raise ValueError(self._FROZEN_ERROR)
+        if type(name_or_path) is str or isinstance(name_or_path, self._feature_name_types):
             del self._features[name_or_path]
         else:
             try:
@@ -420,10 +699,8 @@ class FeatStruct:
         """Set the value for the feature with the given name or path
         to C{value}.  If C{name_or_path} is an invalid path, raise
         C{KeyError}."""
-        if self._frozen:
-            print(self, 'is frozen')
-            raise ValueError(self._FROZEN_ERROR)
-        if isinstance(name_or_path, self._feature_name_types):
+        if type(self) is not FeatStruct and self._frozen: raise ValueError(self._FROZEN_ERROR)
+        if type(name_or_path) is str or isinstance(name_or_path, self._feature_name_types):
             self._features[name_or_path] = value
         else:
             try:
@@ -433,7 +710,7 @@ class FeatStruct:
 
     def clear(self):
         """Remove all features from this C{FeatStruct}."""
-        if self._frozen: raise ValueError(self._FROZEN_ERROR)
+        if type(self) is not FeatStruct and self._frozen: raise ValueError(self._FROZEN_ERROR)
         self._features.clear()
 
     def update(self, features=None, **morefeatures):
@@ -450,7 +727,7 @@ class FeatStruct:
             >>> for name in morefeatures:
             ...     self[name] = morefeatures[name]
         """
-        if self._frozen: raise ValueError(self._FROZEN_ERROR)
+        if type(self) is not FeatStruct and self._frozen: raise ValueError(self._FROZEN_ERROR)
         if features is None:
             items = ()
         elif hasattr(features, 'keys'):
@@ -460,14 +737,18 @@ class FeatStruct:
         else:
             raise ValueError('Expected mapping or list of tuples')
         
+        # Feature names aren't paths, so set them directly; string names
+        # are interned so that lookups can compare them by identity
+        features = self._features
         for key, val in items:
-            if not isinstance(key, self._feature_name_types):
+            if type(key) is str:
+                features[sys.intern(key)] = val
+            elif isinstance(key, self._feature_name_types):
+                features[key] = val
+            else:
                 raise TypeError('Feature names must be strings')
-            self[key] = val
         for key, val in morefeatures.items():
-            if not isinstance(key, self._feature_name_types):
-                raise TypeError('Feature names must be strings')
-            self[key] = val
+            features[sys.intern(key)] = val
 
     def _path_parent(self, path, operation):
         """
@@ -488,7 +769,7 @@ class FeatStruct:
             val = val[name]
         if not isinstance(path[-1], str):
             raise TypeError('Expected str or tuple of str.  Got %r.' % path)
-        return val, path[-1]
+        return val, sys.intern(path[-1])
 
     ##////////////////////////////////////////////////////////////
     #{ Equality & Hashing
@@ -543,47 +824,46 @@ class FeatStruct:
         @param visited_pairs: A set containing C{(selfid, otherid)}
             pairs for all pairs of values we've already visited.
         """
-        # If we're the same object, then we're equal.
-        if self is other: return True
-
-        # If other's not a feature struct, we're definitely not equal.
-        if not isinstance(other, FeatStruct): return False
-
-        # If we have different types, we're not the same.
-        if self._types != other._types:
-            return False
-
-        # If we define different features, we're definitely not equal.
-        # (Perform len test first because it's faster -- we should
-        # do profiling to see if this actually helps)
-        if len(self) != len(other): return False
-        if set(self) != set(other): return False
+        # Pairs of values still to compare; a worklist rather than recursion
+        stack = [(self, other)]
+        while stack:
+            fs1, fs2 = stack.pop()
+
+            # If we're the same object, then we're equal.
+            if fs1 is fs2: continue
+
+            # If other's not a feature struct, we're definitely not equal.
+            if not isinstance(fs2, FeatStruct): return False
+
+            # If we have different types, we're not the same.  Copies
+            # share their original's set of types, so check that first.
+            types1, types2 = fs1._types, fs2._types
+            if types1 is not types2 and types1 != types2:
+                return False
+
+            # If we define different features, we're definitely not equal.
+            features1, features2 = fs1._features, fs2._features
+            if features1.keys() != features2.keys(): return False
+
+            # If we encounter the same (self, other) pair a second time,
+            # then we won't learn anything more by examining their
+            # children a second time.
+            pair = (id(fs1), id(fs2))
+            if pair in visited_pairs: continue
+
+            # Keep track of which nodes we've visited.
+            visited_self.add(pair[0])
+            visited_other.add(pair[1])
+            visited_pairs.add(pair)
+
+            # Now we have to check all values.  If any of them don't match,
+            # then return false.
+            for (fname, fval1) in features1.items():
+                fval2 = features2[fname]
+                if isinstance(fval1, FeatStruct):
+                    stack.append((fval1, fval2))
+                elif fval1 != fval2: return False
 
-        # If we're not checking reentrance, then we still need to deal
-        # with cycles.  If we encounter the same (self, other) pair a
-        # second time, then we won't learn anything more by examining
-        # their children a second time, so just return true.
-        else:
-            if (id(self), id(other)) in visited_pairs:
-                return True
-
-        # Keep track of which nodes we've visited.
-        visited_self.add(id(self))
-        visited_other.add(id(other))
-        visited_pairs.add( (id(self), id(other)) )
-        
-        # Now we have to check all values.  If any of them don't match,
-        # then return false.
-        for (fname, self_fval) in self.items():
-            other_fval = other[fname]
-            if isinstance(self_fval, FeatStruct):
-                if not self_fval._equal(other_fval, 
-                                        visited_self, visited_other,
-                                        visited_pairs):
-                    return False
-            else:
-                if self_fval != other_fval: return False
-                
         # Everything matched up; return true.
         return True
     
@@ -595,26 +875,51 @@ class FeatStruct:
         if not self._frozen:
             raise TypeError('FeatStructs must be frozen before they '
                             'can be hashed.')
+        # Normally set by _freeze()
         try: return self.__hash
         except AttributeError:
             self.__hash = self._hash(set())
             return self.__hash
 
     def _hash(self, visited):
+        """
+        @param visited: The ids of the FSs on the path to this one;
+            an FS that contains itself contributes 1 the second time.
+        """
         if id(self) in visited: return 1
+        # Feature values hashed already (when they were frozen)
+        try: return self.__hash
+        except AttributeError: pass
         visited.add(id(self))
 
+        # Addition is commutative, so the order of the features doesn't matter
         hashval = 0
-        for (fname, fval) in sorted(self.items()):
+        for (fname, fval) in self._features.items():
             hashval += hash(fname)
             if isinstance(fval, FeatStruct):
                 hashval += fval._hash(visited)
             else:
                 hashval += hash(fval)
+        visited.discard(id(self))
 
         # Convert to a 32 bit int.
         return int(hashval & 0x7fffffff)
 
+    def __getstate__(self):
+        """String hashes differ from one process to the next, so the hash
+        isn't pickled; it's recomputed when it's needed."""
+        return None, dict([(name, getattr(self, name)) for name in FeatStruct._PICKLED_SLOTS
+                           if hasattr(self, name)])
+
+    _PICKLED_SLOTS = ('_frozen', '_features', '_types', '_label', '_fsh', '_all_types', '_has_vars')
+
+    def __setstate__(self, state):
+        for name, value in state[1].items():
+            setattr(self, name, value)
+        # FSs pickled frozen before there was a FrozenFeatStruct class
+        if self._frozen and type(self) is FeatStruct:
+            self.__class__ = FrozenFeatStruct
+
     ##////////////////////////////////////////////////////////////
     #{ Freezing
     ##////////////////////////////////////////////////////////////
@@ -646,9 +951,20 @@ class FeatStruct:
         if id(self) in visited: return
         visited.add(id(self))
         self._frozen = True
-        for (fname, fval) in sorted(self.items()):
+        # The mutating methods of FrozenFeatStruct raise errors, so
+        # FeatStruct's only check whether self is frozen for subclasses
+        if type(self) is FeatStruct:
+            self.__class__ = FrozenFeatStruct
+        for fval in self._features.values():
             if isinstance(fval, FeatStruct):
                 fval._freeze(visited)
+        # The hash can't change now, so compute it, using the hashes
+        # already computed for the feature values that are FSs
+        try:
+            self.__hash = self._hash(set())
+        except TypeError:
+            # An unhashable value; __hash__() will fail later
+            pass
 
     def unfreeze(self):
         """Return an unfrozen copy of the FS if frozen; otherwise self."""
@@ -675,10 +991,16 @@ class FeatStruct:
             return FeatStruct(self)
 
     def __deepcopy__(self, memo):
-        memo[id(self)] = selfcopy = self.__class__()
+        memo[id(self)] = selfcopy = _mutable_class(self)()
         selfcopy._types = self._types
-        for (key, val) in self.items():
-            selfcopy[copy.deepcopy(key,memo)] = copy.deepcopy(val,memo)
+        selfcopy._label = self._label
+        selfcopy._fsh = self._fsh
+        # Feature names and atomic values are immutable, so they're shared
+        features = selfcopy._features
+        for (key, val) in self._features.items():
+            if isinstance(val, (FeatStruct, list, dict, set)):
+                val = copy.deepcopy(val, memo)
+            features[key] = val
         return selfcopy
     
     ##////////////////////////////////////////////////////////////
@@ -770,8 +1092,17 @@ class FeatStruct:
     def _str(self):
         """
         @return: A list of lines composing a string representation of
-            this feature structure.  
+            this feature structure.  A frozen FS can't change, so it
+            makes these only once.
         """
+        if self._frozen:
+            try: return self._str_lines
+            except AttributeError:
+                self._str_lines = self._make_str()
+                return self._str_lines
+        return self._make_str()
+
+    def _make_str(self):
         #{ Added by MG
         types = [t._label for t in self._types]
         if types:
@@ -794,22 +1125,26 @@ class FeatStruct:
         maxfnamelen = max(len(str(k)) for k in self.keys())
 
         lines = []
-        items = self.items()
+        features = self._features
+        # Indentation for the lines of FS values, to make room for names,
+        # and padding for the names themselves
+        indent = _spaces(maxfnamelen+3)
+        pad = _spaces(maxfnamelen)
         
-        # sorting note: keys are unique strings, so we'll never fall
-        # through to comparing values.
-        for (fname, fval) in sorted(items):
+        # Sort the names as they're displayed; values are never compared.
+        for fname in sorted(features, key=str):
+            fval = features[fname]
             fname = str(fname)
+            fname += pad[len(fname):]
             if isinstance(fval, Variable):
-                lines.append('%s = %s' % (fname.ljust(maxfnamelen),
-                                          fval.name))
+                lines.append('%s = %s' % (fname, fval.name))
                 
             elif isinstance(fval, Expression):
-                lines.append('%s = <%s>' % (fname.ljust(maxfnamelen), fval))
+                lines.append('%s = <%s>' % (fname, fval))
                 
             elif not isinstance(fval, FeatStruct):
                 # It's not a nested feature structure -- just print it.
-                lines.append('%s = %r' % (fname.ljust(maxfnamelen), fval))
+                lines.append('%s = %r' % (fname, fval))
 
             else:
                 # It's a new feature structure.  Separate it from
@@ -820,13 +1155,13 @@ class FeatStruct:
                 fval_lines = fval._str()
                 
                 # Indent each line to make room for fname.
-                fval_lines = [(' '*(maxfnamelen+3))+l for l in fval_lines]
+                fval_lines = list(map(indent.__add__, fval_lines))
 
                 # Pick which line we'll display fname on.
                 nameline = (len(fval_lines)-1)//2
                 
                 fval_lines[nameline] = (
-                        fname.ljust(maxfnamelen)+' ='+
+                        fname+' ='+
                         fval_lines[nameline][maxfnamelen+2:])
 
                 # Add the feature structure to the output.
@@ -836,11 +1171,11 @@ class FeatStruct:
                 lines.append('')
 
         # Get rid of any excess blank lines.
-        if lines[-1] == '': lines = lines[:-1]
+        if lines[-1] == '': lines.pop()
         
         # Add brackets around everything.
-        maxlen = max(len(line) for line in lines)
-        lines = ['[ %s%s ]' % (line, ' '*(maxlen-len(line))) for line in lines]
+        maxlen = max(map(len, lines))
+        lines = ['[ %s ]' % line.ljust(maxlen) for line in lines]
 
         # If there are types, make them the first line
         #{ Added by MG
@@ -854,27 +1189,19 @@ class FeatStruct:
         """Return a list of abbreviated strings for the feature structure."""
         strings = []
         if long:
-            for feat, value in self.items():
-                s = ''
-                if isinstance(value, FeatStruct):
-                    value = value.string_list(False)
-                    s = feat + ':' + '|'.join(value)
-                elif isinstance(value, bool):
-                    if value:
-                        s = feat
+            for feat, value in self._features.items():
+                # Most values are booleans; bool can't be subclassed
+                if type(value) is bool:
+                    s = feat if value else ''
+                elif isinstance(value, FeatStruct):
+                    s = feat + ':' + '|'.join(value.string_list(False))
+                else:
+                    s = ''
                 strings.append(s)
         else:
-            s = self.__repr__()
-            s = s.replace("'", "").replace(" ", '').replace("[", "").replace("]", "")
-            s_list = s.split(',')
-            s_pos = []
-            for f in s_list:
-                if f[0] == '-':
-                    # False, omit
-                    pass
-                elif f[0] == '+':
-                    # True, drop the '+'
-                    s_pos.append(f[1:])
+            # The names of the True features (the ones that would appear
+            # as +name in the repr); False ones are omitted
+            s_pos = sorted([str(feat) for feat, value in self.items() if value is True])
             if s_pos:
                 s = ','.join(s_pos)
             else:
@@ -882,6 +1209,23 @@ class FeatStruct:
             strings.append(s)
         return strings
 
+class FrozenFeatStruct(FeatStruct):
+    """
+    A FeatStruct that has been frozen. L{FeatStruct.freeze()} changes
+    the class of a FeatStruct to this one; copies are FeatStructs again.
+    """
+    __slots__ = ()
+
+    def _frozen_error(self, *args, **kwargs):
+        raise ValueError(self._FROZEN_ERROR)
+
+    __setitem__ = __delitem__ = clear = update = _frozen_error
+
+def _mutable_class(fs):
+    """The class of an unfrozen copy of fs."""
+    cls = fs.__class__
+    return FeatStruct if cls is FrozenFeatStruct else cls
+
 ######################################################################
 # Playing around -- feature lists
 ######################################################################
@@ -907,42 +1251,42 @@ class FeatureList(list):
         try: return self[key]
         except (IndexError, KeyError): return default
 
-    # Mutation: disable if frozen.
+    # Mutation: disabled once frozen, by FrozenFeatureList.
     _FROZEN_ERROR = "Frozen FeatStructs may not be modified"
-    def check_frozen(func):
-        def wrapped(self, *args, **kwargs):
-            if self._frozen: raise ValueError(self._FROZEN_ERROR)
-            else: return func(self, *args, **kwargs)
-        return wrapped
-    __delitem__ = check_frozen(list.__delitem__)
-    __setitem__ = check_frozen(list.__setitem__)
-    __iadd__ = check_frozen(list.__iadd__)
-    __imul__ = check_frozen(list.__imul__)
-    append = check_frozen(list.append)
-    extend = check_frozen(list.extend)
-    insert = check_frozen(list.insert)
-    pop = check_frozen(list.pop)
-    remove = check_frozen(list.remove)
-    reverse = check_frozen(list.reverse)
-    sort = check_frozen(list.sort)
 
     def freeze(self):
         if self._frozen: return
         self._freeze(set()) # all da way down..
 
-    def _freeze(self):
+    def _freeze(self, visited=None):
         self._frozen = True # hack4now.
+        # Like FeatStruct, switch to a class whose mutating methods raise
+        # errors, so that this one's don't have to check
+        if type(self) is FeatureList:
+            self.__class__ = FrozenFeatureList
+
+class FrozenFeatureList(FeatureList):
+    """A FeatureList that has been frozen."""
+
+    def _frozen_error(self, *args, **kwargs):
+        raise ValueError(self._FROZEN_ERROR)
+
+    __delitem__ = __setitem__ = __iadd__ = __imul__ = _frozen_error
+    append = extend = insert = pop = remove = reverse = sort = _frozen_error
 
 
 ######################################################################
 # Specialized Features
 ######################################################################
 
+@functools.total_ordering
 class Feature(object):
     """
     A feature identifier that's specialized to put additional
     constraints, default values, etc.
     """
+    __slots__ = ('_name', '_default', '_display', '_sortkey')
+
     def __init__(self, name, default=None, display=None):
         assert display in (None, 'prefix', 'slash')
         
@@ -969,10 +1313,15 @@ class Feature(object):
     def __repr__(self):
         return '*%s*' % self.name
 
-    def __cmp__(self, other):
-        if not isinstance(other, Feature): return -1
-        if self._name == other._name: return 0
-        return cmp(self._sortkey, other._sortkey)
+    # Python 3 ignores __cmp__, so these replace it; as before, Features
+    # come before other feature names, and ones with the same name are equal
+    def __eq__(self, other):
+        return isinstance(other, Feature) and self._name == other._name
+
+    def __lt__(self, other):
+        if not isinstance(other, Feature): return True
+        if self._name == other._name: return False
+        return self._sortkey < other._sortkey
 
     def __hash__(self):
         return hash(self._name)
@@ -997,10 +1346,14 @@ FeatStruct._feature_name_types += (Feature,)
 
 
 class SlashFeature(Feature):
+    __slots__ = ()
+
     def parse_value(self, s, position, reentrances, parser):
         return parser.partial_parse(s, position, reentrances)
 
 class RangeFeature(Feature):
+    __slots__ = ()
+
     RANGE_RE = re.compile('(-?\d+):(-?\d+)')
     def parse_value(self, s, position, reentrances, parser):
         m = self.RANGE_RE.match(s, position)
@@ -1021,7 +1374,20 @@ TYPE = Feature('type', display='prefix')
 # Feature Structure Parser
 ######################################################################
 
+def _seq_patterns(close_paren):
+    """Patterns for the parser: an empty sequence, its end, and a separator."""
+    cp = re.escape(close_paren)
+    return (re.compile(r'\s*/?\s*%s' % cp), re.compile(r'\s*%s' % cp),
+            re.compile(r'\s*(,|\+|(?=%s))' % cp))
+
+#: Compiled patterns for FeatStructParser._parse_seq_value(), by close paren
+_SEQ_RE = {')': _seq_patterns(')'), '}': _seq_patterns('}')}
+
 class FeatStructParser(object):
+    # One of these is made for each FS parsed from a string
+    __slots__ = ('_features', '_class', '_prefix_feature', '_slash_feature', '_fsh',
+                 '_features_with_defaults')
+
     def __init__(self, features=(SLASH, TYPE), cls=FeatStruct, fsh=None):
         self._features = dict((f.name,f) for f in features)
         self._class = cls
@@ -1135,21 +1501,20 @@ class FeatStructParser(object):
             return self._finalize(s, match.end(), reentrances, fstruct)
 
         # There is a [; check first for types
-        # Multiple types
-        match = self._TYPES_RE.match(s, position)
+        # Single type, the usual case
+        match = self._TYPE_RE.match(s, position)
         if match:
             # Get the type from the hierarchy and add it to self._types
-            tps = [self_fsh.get(tp.strip()) for tp in match.group(1).split()]
-            for tp in tps:
-                fstruct.add_type(tp)
+            fstruct.add_type(self._fsh.get(match.group(1)))
             position = match.end()
         else:
-            # Single type
-            match = self._TYPE_RE.match(s, position)
+            # Multiple types
+            match = self._TYPES_RE.match(s, position)
             if match:
-                tp = self._fsh.get(match.group(1))
-                # Get the type from the hierarchy and add it to self._types
-                fstruct.add_type(self._fsh.get(match.group(1)))
+                # Get the types from the hierarchy and add them to self._types
+                fsh, add_type = self._fsh, fstruct.add_type
+                for tp in match.group(1).split():
+                    add_type(fsh.get(tp))
                 position = match.end()
 
         # Build a list of the features defined by the structure.
@@ -1170,7 +1535,7 @@ class FeatStructParser(object):
             # Get the feature name's name
             match = self._FEATURE_NAME_RE.match(s, position)
             if match is None: raise ValueError('feature name', position)
-            name = match.group(2)
+            name = sys.intern(match.group(2))
             position = match.end()
 
             # Check if it's a special feature.
@@ -1184,12 +1549,14 @@ class FeatStructParser(object):
                 raise ValueError('new name', match.start(2))
 
             # Boolean value ("+name" or "-name")
-            if match.group(1) == '+': value = True
-            if match.group(1) == '-': value = False
-
-            # Reentrance link ("-> (target)")
-            if value is None:
+            sign = match.group(1)
+            if sign == '+':
+                value = True
+            elif sign == '-':
+                value = False
+            else:
                 match = self._REENTRANCE_RE.match(s, position)
+                # Reentrance link ("-> (target)")
                 if match is not None:
                     position = match.end()
                     match = self._TARGET_RE.match(s, position)
@@ -1201,15 +1568,14 @@ class FeatStructParser(object):
                     position = match.end()
                     value = reentrances[target]
 
-            # Assignment ("= value").
-            if value is None:
-                match = self._ASSIGN_RE.match(s, position)
-                if match:
+                # Assignment ("= value").
+                else:
+                    match = self._ASSIGN_RE.match(s, position)
+                    # None of the above: error.
+                    if not match:
+                        raise ValueError('equals sign', position)
                     position = match.end()
                     value, position = (self._parse_value(name, s, position, reentrances))
-                # None of the above: error.
-                else:
-                    raise ValueError('equals sign', position)
 
             # Store the value.
             fstruct[name] = value
@@ -1250,11 +1616,13 @@ class FeatStructParser(object):
             return self.parse_value(s, position, reentrances)
 
     def parse_value(self, s, position, reentrances):
-        for (handler, regexp) in self.VALUE_HANDLERS:
+        # Only the handlers that can match a value starting with its
+        # first character are tried
+        handlers = self._first_char_handlers.get(s[position:position+1], self._value_handlers)
+        for (handler_func, regexp) in handlers:
             match = regexp.match(s, position)
             if match:
-                handler_func = getattr(self, handler)
-                return handler_func(s, position, reentrances, match)
+                return handler_func(self, s, position, reentrances, match)
         raise ValueError('value', position)
 
     def _error(self, s, expected, position):
@@ -1293,8 +1661,11 @@ class FeatStructParser(object):
     def parse_fstruct_value(self, s, position, reentrances, match):
         return self.partial_parse(s, position, reentrances)
 
+    # Atomic values are interned, so that equal ones are usually
+    # identical, and comparing them is a pointer comparison
     def parse_str_value(self, s, position, reentrances, match):
-        return internals.parse_str(s, position)
+        val, end = internals.parse_str(s, position)
+        return sys.intern(val) if type(val) is str else val, end
 
     def parse_int_value(self, s, position, reentrances, match):
         return int(match.group()), match.end()
@@ -1306,7 +1677,7 @@ class FeatStructParser(object):
     _SYM_CONSTS = {'None':None, 'True':True, 'False':False}
     def parse_sym_value(self, s, position, reentrances, match):
         val, end = match.group(), match.end()
-        return self._SYM_CONSTS.get(val, val), end
+        return self._SYM_CONSTS.get(val, sys.intern(val)), end
 
     def parse_app_value(self, s, position, reentrances, match):
         """Mainly included for backwards compat."""
@@ -1334,17 +1705,20 @@ class FeatStructParser(object):
         """
         Helper function used by parse_tuple_value and parse_set_value.
         """
-        cp = re.escape(close_paren)
+        patterns = _SEQ_RE.get(close_paren)
+        if patterns is None:
+            patterns = _SEQ_RE[close_paren] = _seq_patterns(close_paren)
+        empty_re, close_re, sep_re = patterns
         position = match.end()
         # Special syntax for empty tuples:
-        m = re.compile(r'\s*/?\s*%s' % cp).match(s, position)
+        m = empty_re.match(s, position)
         if m: return seq_class(), m.end()
         # Read values:
         values = []
         seen_plus = False
         while True:
             # Close paren: return value.
-            m = re.compile(r'\s*%s' % cp).match(s, position)
+            m = close_re.match(s, position)
             if m:
                 if seen_plus: return plus_class(values), m.end()
                 else: return seq_class(values), m.end()
@@ -1354,11 +1728,45 @@ class FeatStructParser(object):
             values.append(val)
 
             # Comma or looking at close paren
-            m = re.compile(r'\s*(,|\+|(?=%s))' % cp).match(s, position)
+            m = sep_re.match(s, position)
+            if not m: raise ValueError("',' or '+' or '%s'" % close_paren, position)
             if m.group(1) == '+': seen_plus = True
-            if not m: raise ValueError("',' or '+' or '%s'" % cp, position)
             position = m.end()
 
+#: VALUE_HANDLERS with the handler methods themselves, so that
+#: parse_value() doesn't have to look them up by name
+FeatStructParser._value_handlers = [(getattr(FeatStructParser, handler), regexp)
+                                    for (handler, regexp) in FeatStructParser.VALUE_HANDLERS]
+
+def _first_char_handlers():
+    """
+    Value handlers, in VALUE_HANDLERS order, for the first characters
+    they can match.  Values starting with other characters (whitespace,
+    non-ASCII letters) are tried against all of them.
+    """
+    handlers = dict([(name, entry) for ((name, regexp), entry)
+                     in zip(FeatStructParser.VALUE_HANDLERS, FeatStructParser._value_handlers)])
+    table = {}
+    def add(chars, *names):
+        for char in chars:
+            table[char] = [handlers[name] for name in names]
+    # An FS may start with a reentrance id or a prefix value
+    add('[', 'parse_fstruct_value')
+    add('(', 'parse_fstruct_value', 'parse_tuple_value')
+    add('?', 'parse_fstruct_value', 'parse_var_value')
+    add('-', 'parse_fstruct_value', 'parse_int_value')
+    add('0123456789', 'parse_fstruct_value', 'parse_int_value', 'parse_sym_value')
+    add('abcdefghijklmnopqstvwxyzABCDEFGHIJKLMNOPQSTVWXYZ_',
+        'parse_fstruct_value', 'parse_sym_value')
+    # u'...' and r'...' strings
+    add('uUrR', 'parse_fstruct_value', 'parse_str_value', 'parse_sym_value')
+    add('\'"', 'parse_str_value')
+    add('<', 'parse_app_value', 'parse_logic_value')
+    add('{', 'parse_set_value')
+    return table
+
+FeatStructParser._first_char_handlers = _first_char_handlers()
+
 ######################################################################
 # FeatureValueSet & FeatureValueTuple
 ######################################################################
@@ -1368,10 +1776,18 @@ class SubstituteBindingsSequence(SubstituteBindingsI):
     A mixin class for sequence classes that distributes variables() and
     substitute_bindings() over the object's elements.
     """
+    # Feature values are immutable and there are many of them, so
+    # neither this nor the classes below have instance dicts
+    __slots__ = ()
+
     def variables(self):
-        return ([elt for elt in self if isinstance(elt, Variable)] +
-                sum([elt.variables() for elt in self
-                     if isinstance(elt, SubstituteBindingsI)], []))
+        variables = []
+        for elt in self:
+            if isinstance(elt, Variable):
+                variables.append(elt)
+            elif isinstance(elt, SubstituteBindingsI):
+                variables.extend(elt.variables())
+        return variables
     
     def substitute_bindings(self, bindings):
         return self.__class__([self.subst(v, bindings) for v in self])
@@ -1389,9 +1805,11 @@ class FeatureValueTuple(SubstituteBindingsSequence, tuple):
     variable substitutions will be propagated to the elements
     contained by the set.  C{FeatureValueTuple}s are immutable.
     """
+    __slots__ = ()
+
     def __repr__(self): # [xx] really use %s here?
         if len(self) == 0: return '()'
-        return '(%s)' % ', '.join('%s' % (b,) for b in self)
+        return '(%s)' % ', '.join(map(str, self))
 
 class FeatureValueSet(SubstituteBindingsSequence, frozenset):
     """
@@ -1400,11 +1818,13 @@ class FeatureValueSet(SubstituteBindingsSequence, frozenset):
     variable substitutions will be propagated to the elements
     contained by the set.  C{FeatureValueSet}s are immutable.
     """
+    __slots__ = ()
+
     def __repr__(self): # [xx] really use %s here?
         if len(self) == 0: return '{/}' # distinguish from dict.
         # n.b., we sort the string reprs of our elements, to ensure
         # that our own repr is deterministic.
-        return '{%s}' % ', '.join(sorted('%s' % (b,) for b in self))
+        return '{%s}' % ', '.join(sorted([str(b) for b in self]))
     __str__ = __repr__
 
 class FeatureValueUnion(SubstituteBindingsSequence, frozenset):
@@ -1412,6 +1832,8 @@ class FeatureValueUnion(SubstituteBindingsSequence, frozenset):
     A base feature value that represents the union of two or more
     L{FeatureValueSet}s or L{Variable}s.
     """
+    __slots__ = ()
+
     def __new__(cls, values):
         # If values contains FeatureValueUnions, then collapse them.
         values = _flatten(values, FeatureValueUnion)
@@ -1433,13 +1855,15 @@ class FeatureValueUnion(SubstituteBindingsSequence, frozenset):
         # n.b., we sort the string reprs of our elements, to ensure
         # that our own repr is deterministic.  also, note that len(self)
         # is guaranteed to be 2 or more.
-        return '{%s}' % '+'.join(sorted('%s' % (b,) for b in self))
+        return '{%s}' % '+'.join(sorted([str(b) for b in self]))
 
 class FeatureValueConcat(SubstituteBindingsSequence, tuple):
     """
     A base feature value that represents the concatenation of two or
     more L{FeatureValueTuple}s or L{Variable}s.
     """
+    __slots__ = ()
+
     def __new__(cls, values):
         # If values contains FeatureValueConcats, then collapse them.
         values = _flatten(values, FeatureValueConcat)
@@ -1459,7 +1883,18 @@ class FeatureValueConcat(SubstituteBindingsSequence, tuple):
 
     def __repr__(self):
         # n.b.: len(self) is guaranteed to be 2 or more.
-        return '(%s)' % '+'.join('%s' % (b,) for b in self)
+        return '(%s)' % '+'.join(map(str, self))
+
+def _flatten(lst, cls):
+    """
+    Helper function -- return a copy of list, with all elements of
+    type C{cls} spliced in rather than appended in.
+    """
+    result = []
+    for elt in lst:
+        if isinstance(elt, cls): result.extend(elt)
+        else: result.append(elt)
+    return result
 
 ######################################################################
 #{ Simple unification (no variables)
@@ -1468,36 +1903,48 @@ class FeatureValueConcat(SubstituteBindingsSequence, tuple):
 def simple_unify(x, y):
     """Unify the expressions x and y, returning the result or 'fail'."""
     # If either expression doesn't exist, return the other, unless this is the top-level
-    # If they're the same, return one.
-    if x == y:
+    # If they're the same, return one.  Parsed atomic values are interned,
+    # so equal ones are normally identical.
+    if x is y or x == y:
         return x
     # If both are dicts, call unify_dict
     elif isinstance(x, FeatStruct) and isinstance(y, FeatStruct):
         return unify_dicts(x, y)
     # Otherwise fail
     else:
-        return 'fail'
+        return _FAIL
 
 def unify_dicts(x, y):
     '''Try to unify two dicts in the context of bindings, returning the merged result.'''
     # Make an empty dict of the type of x
     result = FeatStruct()
-    for k in set(x.keys()) | set(y.keys()):
-        # Check all of the keys of x and y
-        x_val, y_val = x.get(k, 'nil'), y.get(k, 'nil')
-        if x_val != 'nil':
-            if y_val != 'nil':
-                # If x and y both have a value for k, try to unify the values
-                u = simple_unify(x_val, y_val)
-                if u == 'fail':
-                    return 'fail'
-                else:
-                    result[k] = u
-            else:
-                # If x has a value for k but y doesn't, use x's value
-                result[k] = x_val
-        elif y_val != 'nil':
+    features = result._features
+    x_features, y_features = x._features, y._features
+    # A value of 'nil' counts as no value
+    for k, x_val in x_features.items():
+        y_val = y_features.get(k, _MISSING)
+        if y_val is _MISSING or y_val == 'nil':
+            # If x has a value for k but y doesn't, use x's value
+            if x_val != 'nil':
+                features[k] = x_val
+        elif x_val == 'nil':
             # If y has a value for k but x doesn't, use y's value
-            result[k] = y_val
+            features[k] = y_val
+        else:
+            # If x and y both have a value for k, try to unify the values;
+            # simple_unify() is inlined here
+            if x_val is y_val or x_val == y_val:
+                features[k] = x_val
+            elif isinstance(x_val, FeatStruct) and isinstance(y_val, FeatStruct):
+                u = unify_dicts(x_val, y_val)
+                if u is _FAIL:
+                    return _FAIL
+                features[k] = u
+            else:
+                return _FAIL
+    for k, y_val in y_features.items():
+        # Values for keys that only y has
+        if k not in x_features and y_val != 'nil':
+            features[k] = y_val
 
     return result
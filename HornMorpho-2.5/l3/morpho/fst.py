@@ -79,7 +79,7 @@ Version 1.0
    for alternation rules.
 """
 
-import re, os, copy, time, functools
+import re, os, sys, copy, time, functools, itertools, pickle, bisect
 from collections import deque
 # Required for weights.
 from .semiring import *
@@ -117,6 +117,15 @@ EP_FILTER_DIR = os.path.join(os.path.dirname(__file__))
 
 UNKNOWN = '?'
 
+# Initial weights already made by FSTCascade.set_init_weight(), keyed by the FS
+# string and the id of its type hierarchy, which is kept along with the weight
+# (emptied when it has more than INIT_WEIGHTS_SIZE, and by l3.clear_caches())
+INIT_WEIGHTS = {}
+INIT_WEIGHTS_SIZE = 1000
+
+# Most compositions an FSTCascade remembers (see FSTCascade.compose())
+COMP_CACHE_SIZE = 32
+
 ## Regexs for parsing FSTs
 # string_set_label={chars1, chars1, chars2, ...}
 SS_RE = re.compile('(\S+)\s*=\s*\{(.*)\}')
@@ -148,20 +157,66 @@ LEX_RE = re.compile(r'(\S+)?\s*\+(.*?)\+\s*(.*?)$')
 SUBCASC_RE = re.compile('cascade\s*(\S+)\s*=\s*\{(.*)\}')
 # +lex+
 CASC_LEX_RE = re.compile(r'\+(.*?)\+')
+# Any line in a cascade file: the regexs above, in the order they're tried;
+# FST lines, the most common, come first (but after the .ar and .mtx lines
+# that CASC_FST_RE would also match), the once-per-file lines last
+CASC_LINE_RE = re.compile('|'.join('(?P<{}>{})'.format(kind, regex.pattern)
+                                   for kind, regex in (('ar', CASC_AR_RE),
+                                                       ('mtax', CASC_MTAX_RE),
+                                                       ('fst', CASC_FST_RE),
+                                                       ('lex', CASC_LEX_RE),
+                                                       ('stringset', SS_RE),
+                                                       ('subcasc', SUBCASC_RE),
+                                                       ('weighting', WEIGHTING_RE))))
 # features = {}
 FEATS_RE = re.compile('features\s*=\s*(.+)')
 # defaultFS = []
 DEFAULT_FS_RE = re.compile('d\S*?\s*=\s*(.+)')
 
+def intern_string(string):
+    """Intern string if it is one (arc labels can be other things)."""
+    return sys.intern(string) if type(string) is str else string
+
 ######################################################################
 # Finite State Transducer Cascade
 ######################################################################
 
+class _LazyFST:
+    """An FST in a cascade that is loaded from its file only when it's needed."""
+
+    def __init__(self, path, weighting=None, lex_features=False, seg_units=[],
+                 weight_constraint=None, minimal=False, verbose=False):
+        self.path = path
+        self.weighting = weighting
+        self.lex_features = lex_features
+        self.seg_units = seg_units
+        self.weight_constraint = weight_constraint
+        self.minimal = minimal
+        self.verbose = verbose
+
+    def __repr__(self):
+        return '<unloaded FST ' + self.path + '>'
+
+    def load(self, cascade):
+        return FST.load(self.path,
+                        cascade=cascade, weighting=self.weighting,
+                        seg_units=self.seg_units, weight_constraint=self.weight_constraint,
+                        minimal=self.minimal, verbose=self.verbose, lex_features=self.lex_features)
+
 class FSTCascade(list):
     """
     A list of FSTs to be composed.
+
+    FSTs may be left unloaded when the cascade is parsed (see parse()); each
+    is loaded when it's first indexed, and all of them when the cascade is
+    iterated over, sliced, searched or copied.
     """
 
+    # No instance dict; the attributes are all set in __init__
+    __slots__ = ('label', '_stringsets', '_symbols', '_symbol_ids', '_ss_bits', '_ss_bits_labels',
+                 '_stringsets_inv', '_weighting', '_comp_cache', '_fsts', 'language', 'init_weight',
+                 '_cascades', '_cascades_fsts', 'seg_units', '_sources')
+
     def __init__(self, label, *fsts):
         list.__init__(self, fsts)
 
@@ -169,12 +224,22 @@ class FSTCascade(list):
 
         # String sets, abbreviated in cascade file
         self._stringsets = {}
+        # The same string sets as bitmaps: integers with a bit for each string
+        # (its position in _symbols) that is in the set, so that they can be
+        # intersected with a single &; only sets and frozensets have them
+        self._symbols = []
+        self._symbol_ids = {}
+        self._ss_bits = {}
+        # Labels for bitmaps, the first label with that set of strings
+        self._ss_bits_labels = {}
+        # Labels for frozensets of strings, also the first label with that set
+        self._stringsets_inv = {}
 
         # Semiring weighting for all FSTs; defaults to FSS with unification
         self._weighting = UNIFICATION_SR
 
-        # Composition of FSTs
-        self._composition = None
+        # Compositions of FSTs, keyed by the arguments to compose()
+        self._comp_cache = {}
 
         # All FSTs, including those not in the composition
         self._fsts = {}
@@ -187,14 +252,140 @@ class FSTCascade(list):
 
         # Dictionary of lists of FST indices, for particular purposes
         self._cascades = {}
+        # The FSTs themselves for each of these, made once the cascade is parsed
+        self._cascades_fsts = {}
 
         # Segmentation units
         self.seg_units = []
 
+        # Paths of the files the cascade was loaded from
+        self._sources = []
+
     def __str__(self):
         """Print name for cascade."""
         return 'FST cascade ' + self.label
 
+    def __getitem__(self, index):
+        item = list.__getitem__(self, index)
+        if isinstance(index, slice):
+            if any(isinstance(fst, _LazyFST) for fst in item):
+                # Load just the FSTs in the slice
+                return [self[i] for i in range(*index.indices(len(self)))]
+        elif isinstance(item, _LazyFST):
+            item = item.load(self)
+            list.__setitem__(self, index, item)
+        return item
+
+    def __iter__(self):
+        self.load_all()
+        return list.__iter__(self)
+
+    def __reversed__(self):
+        self.load_all()
+        return list.__reversed__(self)
+
+    def load_all(self):
+        """Load any FSTs in the cascade that haven't been loaded yet, in order,
+        since loading one may add stringsets and FSTs to the cascade that later
+        ones use."""
+        for index, fst in enumerate(list.__iter__(self)):
+            if isinstance(fst, _LazyFST):
+                list.__setitem__(self, index, fst.load(self))
+
+    def __getstate__(self):
+        """The language is not pickled along with the cascade; load_cache() restores it."""
+        state = dict([(name, getattr(self, name)) for name in FSTCascade.__slots__])
+        state['language'] = None
+        # Compositions are recreated as needed
+        state['_comp_cache'] = {}
+        return state
+
+    def __setstate__(self, state):
+        # Cascades pickled before there were slots may have other attributes
+        for name in FSTCascade.__slots__:
+            if name in state:
+                setattr(self, name, state[name])
+        if '_sources' not in state:
+            self._sources = []
+        self._comp_cache = {}
+        if '_cascades_fsts' not in state:
+            self.make_subcascades()
+        if '_ss_bits' not in state:
+            # Pickled before there were bitmaps
+            self._symbols = []
+            self._symbol_ids = {}
+            self._ss_bits = {}
+            self._ss_bits_labels = {}
+            self._stringsets_inv = {}
+            for label in self._stringsets:
+                self._index_stringset(label)
+
+    def source_mtimes(self):
+        """Modification times of the files the cascade was loaded from."""
+        return dict([(path, os.path.getmtime(path)) for path in self._sources if os.path.exists(path)])
+
+    def save_cache(self, path, inverted=None, version=''):
+        """Pickle the cascade to path, preceded by version (of the code) and the
+        modification times of its source files. inverted, the inverted cascade,
+        if given, is pickled along with it, so the two can be restored with a
+        single read. Returns False if the file couldn't be written."""
+        temp = path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp, 'wb') as file:
+                pickle.dump((version, self.source_mtimes()), file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump((self, inverted), file, protocol=pickle.HIGHEST_PROTOCOL)
+            # Replace any old cache only once the new one is complete
+            os.replace(temp, path)
+        except (OSError, pickle.PicklingError):
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            return False
+        return True
+
+    @staticmethod
+    def load_cache(path, language=None, version='', verbose=False):
+        """Restore a cascade pickled by save_cache() and its inverted cascade (None
+        if it wasn't saved), or return None if there is none, if it was saved
+        by another version, or if any of its source files has changed since."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as file:
+                key = pickle.load(file)
+                if not isinstance(key, tuple) or key[0] != version:
+                    if verbose:
+                        print('Cached cascade in', path, 'is from another version')
+                    return None
+                for source, mtime in key[1].items():
+                    if not os.path.exists(source) or os.path.getmtime(source) != mtime:
+                        if verbose:
+                            print('Cached cascade in', path, 'is out of date')
+                        return None
+                cascades = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Unreadable or truncated; errors from restoring the objects themselves
+            # (a broken __setstate__, say) aren't caught
+            if verbose:
+                print("Couldn't read cached cascade in", path)
+            return None
+        if not isinstance(cascades, tuple):
+            # An older cache, with no place for the inverted cascade
+            return None
+        if verbose:
+            print('Loaded cascade from', path)
+        for cascade in cascades:
+            if cascade is None:
+                continue
+            cascade.language = language
+            # Unpickling makes separate copies of equal strings in different FSTs
+            for fst in cascade:
+                if isinstance(fst, FST):
+                    fst.intern_strings()
+        return cascades
+
     def get_cas_dir(self):
         return os.path.join(self.language.directory, 'cas')
         
@@ -215,27 +406,60 @@ class FSTCascade(list):
         inv.init_weight = self.init_weight
         inv._weighting = self._weighting
         inv._stringsets = self._stringsets
+        inv._symbols = self._symbols
+        inv._symbol_ids = self._symbol_ids
+        inv._ss_bits = self._ss_bits
+        inv._ss_bits_labels = self._ss_bits_labels
+        inv._stringsets_inv = self._stringsets_inv
         return inv
 
     def compose(self, begin=0, end=None, first=None, last=None, subcasc=None, backwards=False,
                 relabel=True, trace=0):
-        """Compose the FSTs that make up the cascade list or a sublist, including possible first and last FSTs."""
+        """Compose the FSTs that make up the cascade list or a sublist, including possible first and last FSTs.
+        Compositions are remembered; one is recomputed only if any of the FSTs it
+        was made from, or the composition itself, has been replaced or changed."""
         if len(self) == 1:
             return self[0]
-        elif backwards:
-            return self.compose_backwards(trace=trace)
+        key = (begin, end, id(first), id(last), subcasc, backwards, relabel)
+        cached = self._comp_cache.get(key)
+        if cached and self._comp_unchanged(cached[0], first, last, cached[1]):
+            return cached[1]
+        fst = self._compose(begin=begin, end=end, first=first, last=last, subcasc=subcasc,
+                            backwards=backwards, relabel=relabel, trace=trace)
+        if len(self._comp_cache) >= COMP_CACHE_SIZE:
+            self._comp_cache.clear()
+        # Composing may have loaded some of the FSTs
+        self._comp_cache[key] = (self._comp_sources(first, last, fst), fst)
+        return fst
+
+    def _comp_sources(self, first, last, fst):
+        """The FSTs that the composition fst was made from, and fst itself, each
+        paired with its count of changes (see FST._arcs_changed())."""
+        fsts = itertools.chain(list.__iter__(self), (first, last, fst))
+        return tuple([(f, f._changes if isinstance(f, FST) else 0) for f in fsts])
+
+    def _comp_unchanged(self, sources, first, last, fst):
+        """Are the FSTs stored with the composition fst the current ones, unchanged?
+        The stored FSTs are kept alive, so their ids can't be reused."""
+        current = self._comp_sources(first, last, fst)
+        return len(sources) == len(current) and \
+               all(f1 is f2 and n1 == n2 for (f1, n1), (f2, n2) in zip(sources, current))
+
+    def _compose(self, begin=0, end=None, first=None, last=None, subcasc=None, backwards=False,
+                 relabel=True, trace=0):
+        if backwards:
+            return self.compose_backwards(subcasc=subcasc, trace=trace)
+        elif not subcasc and not first and not last and not begin and (end is None or end == len(self)):
+            # The whole cascade, by far the most common case
+            return FST.compose(self, self.label + '@', relabel=relabel, trace=trace)
         else:
-            fsts = []
             if subcasc:
-                if subcasc not in self._cascades:
-                    raise ValueError("%r is not a valid subscascade label" % subcasc)
-                fsts = [self[i] for i in self._cascades[subcasc]]
+                fsts = self.subcascade(subcasc)
             else:
-                fsts = self[begin:(end if end != None else len(self))]  # end could be 0
-                if first:
-                    fsts = [first] + fsts
-                if last:
-                    fsts.append(last)
+                # Avoid copying the cascade list; end could be 0
+                fsts = itertools.chain((first,) if first else (),
+                                       itertools.islice(self, begin, end if end != None else len(self)),
+                                       (last,) if last else ())
             return FST.compose(fsts, self.label + '@', relabel=relabel, trace=trace)
 
     def mult_compose(self, ends):
@@ -254,30 +478,48 @@ class FSTCascade(list):
         # Compose from beginning to split_index
         return self.compose(begin=begin, end=split_index, last=c1, trace=trace)
 
-    def compose_backwards(self, indices=[], subcasc=None, trace=0):
-        if not indices:
-            if subcasc:
-                # Use a copy of the cascade indices because we're going to reverse them
-                indices = list(self._cascades[subcasc])
-            else:
-                indices = list(range(len(self)))
-        indices.reverse()
-        c = FST.compose([self[indices[1]], self[indices[0]]], trace=trace)
-        for n in indices[2:]:
-            c = FST.compose([self[n], c], trace=trace)
-        return c
+    def make_subcascades(self):
+        """Record the FSTs in each subcascade, so they don't have to be looked up by index
+        each time the subcascade is composed."""
+        self._cascades_fsts = dict([(label, tuple([self[i] for i in indices]))
+                                    for label, indices in self._cascades.items()])
+
+    def subcascade(self, subcasc):
+        """Tuple of the FSTs in the subcascade with label subcasc."""
+        if subcasc not in self._cascades:
+            raise ValueError("%r is not a valid subscascade label" % subcasc)
+        fsts = self._cascades_fsts.get(subcasc)
+        if fsts is None:
+            fsts = self._cascades_fsts[subcasc] = tuple([self[i] for i in self._cascades[subcasc]])
+        return fsts
+
+    def compose_backwards(self, indices=None, subcasc=None, trace=0):
+        """Compose the FSTs (those with indices or in subcasc if given) pairwise,
+        then the results pairwise, and so on, rather than one at a time from the end,
+        so that the FSTs being composed are of similar sizes."""
+        if indices:
+            fsts = [self[i] for i in indices]
+        elif subcasc:
+            fsts = list(self.subcascade(subcasc))
+        else:
+            fsts = list(self)
+        while len(fsts) > 1:
+            # An odd one out at the end waits for the next round
+            fsts = [FST.compose([fsts[i], fsts[i+1]], trace=trace) for i in range(0, len(fsts) - 1, 2)] + \
+                   ([fsts[-1]] if len(fsts) % 2 else [])
+        return fsts[0]
 
     def composition(self, begin=0, end=None):
         """The composed FSTs."""
-        if not self._composition:
-            self._composition = self.compose(begin=begin, end=end or len(self))
-        return self._composition
+        return self.compose(begin=begin, end=end or len(self))
 
     def transduce(self, inp_string, inp_weight, fsts, seg_units=[]):
         result = [[inp_string, inp_weight]]
         for fst in fsts:
-            print(fst.label)
-            result = reduce_lists([fst.transduce(x[0], x[1], seg_units=seg_units) for x in result])
+            outputs = []
+            for output in result:
+                outputs.extend(fst.transduce(output[0], output[1], seg_units=seg_units))
+            result = outputs
             if not result:
                 return False
         return result
@@ -306,6 +548,9 @@ class FSTCascade(list):
 
     def stringset_label(self, stringset):
         """The label for a stringset if it's in the dict."""
+        if isinstance(stringset, (set, frozenset)):
+            # Only sets are equal to sets
+            return self._stringsets_inv.get(stringset if isinstance(stringset, frozenset) else frozenset(stringset))
         for label, sset in self._stringsets.items():
             if stringset == sset:
                 return label
@@ -314,6 +559,18 @@ class FSTCascade(list):
         """Label for the intersection of two stringsets or element if only one.
 
         Either the labels or the stringsets or both are provided."""
+        bits1 = self._stringset_bits(ss_label1, ss1)
+        bits2 = self._stringset_bits(ss_label2, ss2)
+        if bits1 is not None and bits2 is not None:
+            # Both are stored stringsets, so intersect their bitmaps
+            bits = bits1 & bits2
+            if bits:
+                if not bits & (bits - 1):
+                    # Only one bit, so only one element
+                    return self._symbols[bits.bit_length() - 1]
+                return self._ss_bits_labels.get(bits) or \
+                       FSTCascade.simplify_intersection_label(ss_label1, ss_label2)
+            return
         ss1 = ss1 or self.stringset(ss_label1)
         ss2 = ss2 or self.stringset(ss_label2)
         ss_label1 = ss_label1 or self.stringset_label(ss1)
@@ -335,8 +592,10 @@ class FSTCascade(list):
                 return new_label
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def simplify_intersection_label(label1, label2):
-        """Simplify an intersection label by eliminating common elements."""
+        """Simplify an intersection label by eliminating common elements.
+        A grammar has only so many labels, so the results are remembered."""
         if not '&' in label1 and not '&' in label2:
             # the two expressions between with the same stringset
             return FSTCascade.simplify_difference_intersection_labels(label1, label2)
@@ -344,6 +603,7 @@ class FSTCascade(list):
             return '&'.join(set(label1.split('&')) | set(label2.split('&')))
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def simplify_difference_intersection_labels(label1, label2):
         """Simplify an intersection of differences if first elements are the same."""
         labels1 = label1.split('-')
@@ -382,7 +642,9 @@ class FSTCascade(list):
 
     def intersect_stringsets(self, labels):
         """Intersection of stringsets with given labels."""
-        return functools.reduce(lambda x, y: x.intersection(y), [self.diff_stringset(label) for label in labels])
+        # Smallest first, so the intersection starts small
+        sets = sorted([self.diff_stringset(label) for label in labels], key=len)
+        return sets[0].intersection(*sets[1:])
 
     def diff_stringset(self, label):
         """label is either a stored stringset or a stringset difference expression."""
@@ -406,6 +668,52 @@ class FSTCascade(list):
     def add_stringset(self, label, seq):
         """Add a labeled set of strings, updating sigma accordingly."""
         self._stringsets[label] = frozenset(seq)
+        self._index_stringset(label)
+        self._arcs_changed()
+
+    def _arcs_changed(self):
+        """Forget the arc tables of the cascade's FSTs, which depend on its stringsets."""
+        # FSTs that haven't been loaded yet have no tables
+        for fst in itertools.chain(list.__iter__(self), self._fsts.values()):
+            if isinstance(fst, FST):
+                fst._arcs_changed()
+
+    def _index_stringset(self, label):
+        """Make the bitmap for the stringset with label, which has just been
+        added or replaced."""
+        ss = self._stringsets[label]
+        replaced = label in self._ss_bits
+        if isinstance(ss, (set, frozenset)):
+            symbol_ids = self._symbol_ids
+            bits = 0
+            for string in ss:
+                index = symbol_ids.get(string)
+                if index is None:
+                    index = symbol_ids[string] = len(self._symbols)
+                    self._symbols.append(string)
+                bits |= 1 << index
+            self._ss_bits[label] = bits
+            if not replaced:
+                self._ss_bits_labels.setdefault(bits, label)
+                self._stringsets_inv.setdefault(frozenset(ss), label)
+        elif replaced:
+            del self._ss_bits[label]
+        if replaced:
+            # The label may have been the first one for its old set of strings;
+            # start over, in the order of the labels
+            self._ss_bits_labels.clear()
+            self._stringsets_inv.clear()
+            for lbl, sset in self._stringsets.items():
+                if lbl in self._ss_bits:
+                    self._ss_bits_labels.setdefault(self._ss_bits[lbl], lbl)
+                    self._stringsets_inv.setdefault(frozenset(sset), lbl)
+
+    def _stringset_bits(self, label, stringset=None):
+        """The bitmap for the stringset with label, unless it has none or stringset
+        is given and isn't that stringset."""
+        bits = self._ss_bits.get(label)
+        if bits is not None and (stringset is None or stringset is self._stringsets.get(label)):
+            return bits
 
     def weighting(self):
         """The weighting semiring for the cascade."""
@@ -426,151 +734,141 @@ class FSTCascade(list):
         return self._fsts.get(label)
 
     def set_init_weight(self, fs):
-        self.init_weight = FSSet(fs)
+        """Set the initial weight for transduction to the FSSet for fs; weights
+        aren't modified, so cascades with the same initial FS share the FSSet."""
+        fsh = getattr(fs, '_fsh', None)
+        key = (repr(fs), id(fsh))
+        cached = INIT_WEIGHTS.get(key)
+        # Make sure the id isn't that of another hierarchy
+        if cached is None or cached[0] is not fsh:
+            if len(INIT_WEIGHTS) >= INIT_WEIGHTS_SIZE:
+                INIT_WEIGHTS.clear()
+            cached = INIT_WEIGHTS[key] = (fsh, FSSet(fs))
+        self.init_weight = cached[1]
 
     @staticmethod
     def load(filename, seg_units=[], create_networks=True, subcasc=None, language=None,
-             weight_constraint=None, verbose=True):
+             weight_constraint=None, minimal=False, lazy=False, verbose=True):
         """
         Load an FST cascade from a file.
 
         If not create_networks, only create the weighting and string sets.
+        If minimal, minimize the FSTs made from lexicons.
+        If lazy, load each FST only when it's needed (see parse()).
         """
         if verbose:
             print('Loading FST cascade from', filename, 'for', language)
         directory, fil = os.path.split(filename)
         label = del_suffix(fil, '.')
 
-        return FSTCascade.parse(label, open(filename, encoding='utf-8').read(), directory=directory,
-                                subcasc=subcasc, create_networks=create_networks, seg_units=seg_units,
-                                language=language, weight_constraint=weight_constraint, verbose=verbose)
+        # The file is parsed a line at a time as it's read
+        with open(filename, encoding='utf-8') as file:
+            cascade = FSTCascade.parse(label, file, directory=directory,
+                                       subcasc=subcasc, create_networks=create_networks, seg_units=seg_units,
+                                       language=language, weight_constraint=weight_constraint,
+                                       minimal=minimal, lazy=lazy, verbose=verbose)
+        cascade._sources.append(filename)
+        return cascade
 
     @staticmethod
     def parse(label, s, directory='', create_networks=True, seg_units=[],
               subcasc=None, language=None,
-              weight_constraint=None, verbose=False):
+              weight_constraint=None, minimal=False, lazy=False, verbose=False):
         """
-        Parse an FST cascade from the contents of a file as a string.
+        Parse an FST cascade from the contents of a file, as a string or
+        an iterable of lines (such as the open file).
 
         If not create_networks, only create the weighting and string sets.
+        If minimal, minimize the FSTs made from lexicons.
+        If lazy, leave the FSTs unloaded until they're needed; string sets
+        defined in FST files are only added to the cascade then.
         """
 
         cascade = FSTCascade(label)
         cascade.language = language
         cascade.seg_units = seg_units
         
-        lines = s.split('\n')[::-1]
         subcasc_indices = []
 
-        while lines:
-            line = lines.pop().split('#')[0].strip() # strip comments
+        lines = s.splitlines() if isinstance(s, str) else s
+        for line in lines:
+            line = line.split('#', 1)[0].strip() # strip comments
 
             if not line: continue
 
+            # All of the line types at once; the first alternative that matches wins
+            m = CASC_LINE_RE.match(line)
+            if not m:
+                raise ValueError("bad line: %r" % line)
+            kind = m.lastgroup
+            # The groups within the one that matched
+            group = m.lastindex
+
             # Weighting for all FSTs
-            m = WEIGHTING_RE.match(line)
-            if m:
-                cascade.set_weighting(m.group(1))
-                continue
+            if kind == 'weighting':
+                cascade.set_weighting(m.group(group + 1))
 
             # Subcascade, specifying indices
             #   label = {i, j, ...}
-            m = SUBCASC_RE.match(line)
-            if m:
-                label, indices = m.groups()
+            elif kind == 'subcasc':
+                label, indices = m.group(group + 1, group + 2)
                 indices = [int(i.strip()) for i in indices.split(',')]
                 cascade._cascades[label] = indices
                 # If we're only loading a certain subcascade and this is it, save its indices
                 if label == subcasc:
                     subcasc_indices = indices
-                continue
 
             # String set (a list, converted to a frozenset)
-            m = SS_RE.match(line)
-
-            if m:
-                label, strings = m.groups()
+            elif kind == 'stringset':
+                label, strings = m.group(group + 1, group + 2)
                 # Characters may contain unicode
 #                strings = strings.decode('utf8')
                 cascade.add_stringset(label, [s.strip() for s in strings.split(',')])
-                continue
 
-            # Alternation rule
-            m = CASC_AR_RE.match(line)
-            if m:
-                if create_networks:
-                    filename = m.group(1)
-                    if not subcasc_indices or len(cascade) in subcasc_indices:
-                        fst = FST.load(os.path.join(cascade.get_fst_dir(), filename),
-                                       cascade=cascade, weighting=cascade.weighting(),
-                                       seg_units=seg_units, weight_constraint=weight_constraint,
-                                       verbose=verbose)
-                    else:
-                        fst = 'FST' + str(len(cascade))
-                        if verbose:
-                            print('Skipping FST', label)
-                    cascade.append(fst)
-                continue
-
-            # Morphotactics
-            m = CASC_MTAX_RE.match(line)
-            if m:
-                if create_networks:
-                    filename = m.group(1)
-                    if not subcasc_indices or len(cascade) in subcasc_indices:
-                        fst = FST.load(os.path.join(cascade.get_fst_dir(), filename),
-                                       cascade=cascade, weighting=cascade.weighting(),
-                                       seg_units=seg_units, weight_constraint=weight_constraint,
-                                       verbose=verbose)
-                    else:
-                        fst = 'FST' + str(len(cascade))
-                        if verbose:
-                            print('Skipping FST', label)
-                    cascade.append(fst)
-                continue
+            # Alternation rule, morphotactics, FST, or FST in a lex file
+            elif create_networks:
+                label = m.group(group + 1)
+                if kind == 'lex':
+                    path = os.path.join(cascade.get_lex_dir(), label + '.lex')
+                elif kind == 'fst':
+                    path = os.path.join(cascade.get_fst_dir(), label + '.fst')
+                else:
+                    path = os.path.join(cascade.get_fst_dir(), label)
+                if not subcasc_indices or len(cascade) in subcasc_indices:
+                    if verbose and kind == 'lex':
+                        print('Adding lex FST', label, 'to cascade')
+                    # Loaded below, along with the others, or when needed
+                    cascade.append(_LazyFST(path, weighting=cascade.weighting(), lex_features=kind == 'lex',
+                                            seg_units=seg_units, weight_constraint=weight_constraint,
+                                            minimal=minimal, verbose=verbose))
+                else:
+                    if verbose:
+                        print('Skipping lex FST' if kind == 'lex' else 'Skipping FST', label)
+                    cascade.append('FST' + str(len(cascade)))
 
-            # FST
-            m = CASC_FST_RE.match(line)
-            if m:
-                if create_networks:
-                    label = m.group(1)
-                    filename = label + '.fst'
-                    if not subcasc_indices or len(cascade) in subcasc_indices:
-                        fst = FST.load(os.path.join(cascade.get_fst_dir(), filename),
-                                       cascade=cascade, weighting=cascade.weighting(),
-                                       seg_units=seg_units, weight_constraint=weight_constraint,
-                                       verbose=verbose)
-                    else:
-                        fst = 'FST' + str(len(cascade))
-                        if verbose:
-                            print('Skipping FST', label)
-                    cascade.append(fst)
-                continue
-
-            # FST in a lex file
-            m = CASC_LEX_RE.match(line)
-            if m:
-                if create_networks:
-                    label = m.group(1)
-                    # handle specs
-                    filename = label + '.lex'
-                    if not subcasc_indices or len(cascade) in subcasc_indices:
-                        if verbose:
-                            print('Adding lex FST', label, 'to cascade')
-                        fst = FST.load(os.path.join(cascade.get_lex_dir(), filename),
-                                       cascade=cascade, weighting=cascade.weighting(),
-                                       seg_units=seg_units, weight_constraint=weight_constraint,
-                                       verbose=verbose, lex_features=True)
-                    else:
-                        fst = 'FST' + str(len(cascade))
-                        if verbose:
-                            print('Skipping lex FST', label)
-                    cascade.append(fst)
-                continue
-            raise ValueError("bad line: %r" % line)
+        if not lazy:
+            cascade.load_all()
+            cascade.make_subcascades()
 
         return cascade
 
+def _loading(name):
+    """The list method name, made to load any unloaded FSTs in the cascade first."""
+    method = getattr(list, name)
+    def loading(self, *args, **kwargs):
+        self.load_all()
+        return method(self, *args, **kwargs)
+    loading.__name__ = name
+    loading.__doc__ = method.__doc__
+    return loading
+
+# Other list methods that return or search the items, so that they never
+# see the placeholders for unloaded FSTs (comparisons are left alone, since
+# FST code compares cascades to None)
+for _name in ('__contains__', 'index', 'count', 'copy', 'pop', 'remove', 'sort',
+              '__add__', '__mul__', '__rmul__'):
+    setattr(FSTCascade, _name, _loading(_name))
+
 ######################################################################
 #{ Finite State Transducer
 ######################################################################
@@ -598,6 +896,10 @@ class FST:
     An FST is weighted if weighting is some Semiring. (MG)
     """
 
+    # Number of times the arcs, states or stringsets have changed, so that
+    # compositions made from the FST can be checked (see FSTCascade.compose())
+    _changes = 0
+
     def __init__(self, label, cascade=None, weighting=None):
         """
         Create a new finite state transducer, containing no states.
@@ -725,6 +1027,17 @@ class FST:
 
         self._n_arcs = -1
         """Keep track of number of arcs to label arcs uniquely."""
+
+        self._input_arcs = {}
+        """A dictionary mapping (state, input character) pairs to tuples of
+        the outgoing arcs whose input strings could match the character
+        (None for the end of the input); filled in during transduction
+        and emptied whenever arcs change."""
+
+        self._arc_tables = {}
+        """A dictionary mapping state labels to tables of their outgoing arcs,
+        stored as parallel tuples (see arc_table()); emptied whenever
+        arcs change."""
         #}
 
         #{ Add to dict in parent cascade (MG)
@@ -910,9 +1223,29 @@ class FST:
         """Add a labeled set of strings, updating sigma accordingly. (MG)"""
         self._stringsets[label] = lst
         self._sigma = self._sigma.union(lst)
+        if self.cascade is not None and self._stringsets is self.cascade._stringsets:
+            # Keep the cascade's bitmaps up to date; the other FSTs sharing
+            # the stringsets have to make their arc tables again too
+            self.cascade._index_stringset(label)
+            self.cascade._arcs_changed()
+        self._arcs_changed()
 
     def stringset_label(self, stringset):
         """The label for a stringset if it's in the dict."""
+        if self.cascade is not None and self._stringsets is self.cascade._stringsets:
+            # The cascade indexes its stringsets
+            return self.cascade.stringset_label(stringset)
+        if isinstance(stringset, (set, frozenset)):
+            # Frozensets remember their hashes, so comparing hashes first
+            # rules out most of the stored sets without comparing elements
+            stringset = frozenset(stringset)
+            ss_hash = hash(stringset)
+            for label, sset in self._stringsets.items():
+                if isinstance(sset, frozenset) and hash(sset) != ss_hash:
+                    continue
+                if stringset == sset:
+                    return label
+            return
         for label, sset in self._stringsets.items():
             if stringset == sset:
                 return label
@@ -954,7 +1287,9 @@ class FST:
 
     def intersect_stringsets(self, labels):
         """Intersection of stringsets with given labels."""
-        return functools.reduce(lambda x, y: x.intersection(y), [self.diff_stringset(label) for label in labels])
+        # Smallest first, so the intersection starts small
+        sets = sorted([self.diff_stringset(label) for label in labels], key=len)
+        return sets[0].intersection(*sets[1:])
 
     def diff_stringset(self, label):
         """label is either a stored stringset or a stringset difference expression."""
@@ -1067,6 +1402,7 @@ class FST:
         del (self._incoming[label], self._outgoing[label],
              self._is_final[label], self._state_descr[label],
              self._finalizing_string[label])
+        self._arcs_changed()
         if label in self._final_weight:
              del self._final_weight[label]
 
@@ -1189,8 +1525,10 @@ class FST:
         # Add the arc.
         self._src[label] = src
         self._dst[label] = dst
-        self._in_string[label] = in_string
-        self._out_string[label] = out_string
+        # Interned so that equal symbols on different arcs are one object
+        # and compare by identity
+        self._in_string[label] = in_string = intern_string(in_string)
+        self._out_string[label] = out_string = intern_string(out_string)
         self._arc_descr[label] = descr
         #{ (MG)
         if self.is_weighted() and weight and weight != self.default_weight():
@@ -1202,6 +1540,7 @@ class FST:
         # Link the arc to its src/dst states.
         self._incoming[dst].append(label)
         self._outgoing[src].append(label)
+        self._arcs_changed()
 
         # Return the new arc's label.
         return label
@@ -1221,6 +1560,7 @@ class FST:
         # Disconnect the arc from its src/dst states.
         self._incoming[self._dst[label]].remove(label)
         self._outgoing[self._src[label]].remove(label)
+        self._arcs_changed()
 
         # Delete the arc itself.
         del (self._src[label], self._dst[label], self._in_string[label],
@@ -1328,6 +1668,68 @@ class FST:
         if trace and deleted > 0:
             print('Deleted', deleted, 'total states from', self.label)
     
+    def minimize_acyclic(self, trace=0):
+        """Merge equivalent states in an acyclic FST, such as one created from
+        a letter tree, so that common suffixes share states.
+
+        States are visited in postorder, and each is either registered under
+        its signature (finality, final weight and destination, outgoing arcs to
+        already canonical states) or replaced by the registered state with the
+        same signature, as in Daciuk et al.'s incremental construction of
+        minimal acyclic automata."""
+        if self._initial_state is None:
+            raise ValueError("No initial state!")
+        # Postorder of the states reachable from the initial state
+        postorder = []
+        visited = {self._initial_state}
+        stack = [(self._initial_state, iter(self._outgoing[self._initial_state]))]
+        while stack:
+            state, arcs = stack[-1]
+            for arc in arcs:
+                dst = self._dst[arc]
+                if dst not in visited:
+                    visited.add(dst)
+                    stack.append((dst, iter(self._outgoing[dst])))
+                    break
+            else:
+                stack.pop()
+                postorder.append(state)
+        # Replace each state by the registered state with the same signature
+        register = {}
+        canonical = {}
+        for state in postorder:
+            arcs = tuple(sorted((self._in_string[arc], self._out_string[arc],
+                                 repr(self._weight.get(arc)), canonical[self._dst[arc]])
+                                for arc in self._outgoing[state]))
+            signature = (self._is_final[state], self._finalizing_string[state],
+                         repr(self._final_weight.get(state)), repr(self._final_dst.get(state)),
+                         arcs)
+            canonical[state] = register.setdefault(signature, state)
+        # Delete the replaced states and their outgoing arcs ...
+        deleted = 0
+        for state, canon in canonical.items():
+            if state != canon:
+                for arc in self._outgoing[state]:
+                    del (self._src[arc], self._dst[arc], self._in_string[arc],
+                         self._out_string[arc], self._arc_descr[arc])
+                    self._weight.pop(arc, None)
+                del (self._incoming[state], self._outgoing[state],
+                     self._is_final[state], self._state_descr[state],
+                     self._finalizing_string[state])
+                self._final_weight.pop(state, None)
+                self._final_dst.pop(state, None)
+                deleted += 1
+        # ... and redirect the remaining arcs to canonical states
+        for state in self._incoming:
+            self._incoming[state] = []
+        for arc, dst in self._dst.items():
+            dst = canonical.get(dst, dst)
+            self._dst[arc] = dst
+            self._incoming[dst].append(arc)
+        self._arcs_changed()
+        if trace:
+            print('Merged', deleted, 'states in', self.label)
+
     def relabeled(self, label=None, relabel_states=True, relabel_arcs=True):
         """
         Return a new FST that is identical to this FST, except that
@@ -1759,14 +2161,19 @@ class FST:
 
     @staticmethod
     def load(filename, cascade=None, weighting=None, seg_units=[], verbose=False, lex_features=False,
-             dest_lex=False, weight_constraint=None):
+             dest_lex=False, weight_constraint=None, minimal=False):
         """
         Load an FST from a file (modified significantly by MG).
 
         dest_lex=True means that the destination FST is specified for each entry in a .lex file.
+        minimal=True means that FSTs made from .lex files are minimized.
         """
         directory, fil = os.path.split(filename)
         label, suffix = fil.split('.')
+        if cascade is not None:
+            # Record the file as a source of the cascade, so that a cached copy
+            # of the cascade isn't used once the file has changed
+            cascade._sources.append(filename)
 
         if suffix == 'fst':
             if verbose:
@@ -1784,7 +2191,7 @@ class FST:
             mtax = MTax(fst, directory=directory)
             mtax.parse(label, open(filename, encoding='utf-8').read(),
                        verbose=verbose)
-            mtax.compile(verbose=verbose)
+            mtax.compile(minimal=minimal, verbose=verbose)
             return fst
 
         elif suffix == 'ar':
@@ -1805,7 +2212,7 @@ class FST:
                                                 verbose=False),
                                    label, cascade=cascade, weighting=weighting,
                                    lex_features=lex_features, weight_constraint=weight_constraint,
-                                   dest=dest_lex, verbose=False)
+                                   dest=dest_lex, minimal=minimal, verbose=False)
 
     @staticmethod
     def parse(label, s, weighting=None, cascade=None, directory='', seg_units=[], verbose=False, weight_constraint=None):
@@ -2180,10 +2587,11 @@ class FST:
 
     @staticmethod
     def tree_to_fst(tree, label, cascade=None, weighting=None, lex_features=False, dest=False, weight_constraint=None,
-                    verbose=False):
+                    minimal=False, verbose=False):
         """Turn a letter tree into an FST (MG).
 
-        dest=True means that destination FSTs appear before weights in a pair."""
+        dest=True means that destination FSTs appear before weights in a pair.
+        minimal=True means that equivalent states are merged."""
         fst = FST(label, cascade=cascade, weighting=weighting)
 
         weighting = fst.weighting()
@@ -2192,6 +2600,8 @@ class FST:
         fst._set_initial_state('start')
         fst._subtree_to_states('start', tree, '', weighting=weighting, lex_features=lex_features, dest=dest,
                                weight_constraint=weight_constraint, verbose=verbose)
+        if minimal:
+            fst.minimize_acyclic(trace=verbose)
         return fst
 
     def _subtree_to_states(self, state, subtree, label, weighting=None, lex_features=False, dest=False,
@@ -2441,6 +2851,98 @@ class FST:
         """Does the target string match the unknown character? (MG)"""
         return target not in self.sigma()
 
+    def _arcs_changed(self):
+        """Forget the arc tables, which are out of date once arcs, states or stringsets change."""
+        self._changes += 1
+        self._input_arcs.clear()
+        self._arc_tables.clear()
+
+    def arc_table(self, state):
+        """A table of the outgoing arcs from state, as parallel tuples rather than
+        a list of arc labels to be looked up in the arc dicts:
+          - arcs:     the arcs in their original order
+          - epsilons: positions (in arcs) of arcs with empty input strings
+          - specials: positions of arcs with stringsets or the unknown character as input
+          - in_strings: the other input strings, sorted, so those matching a character
+                      can be found by binary search
+          - positions: positions of the arcs with those input strings."""
+        table = self._arc_tables.get(state)
+        if table is None:
+            arcs = tuple(self._outgoing[state])
+            epsilons = []
+            specials = []
+            literals = []
+            for position, arc in enumerate(arcs):
+                in_string = self._in_string[arc]
+                if in_string == '':
+                    epsilons.append(position)
+                elif self._label_unknown(in_string) or self.stringset(in_string):
+                    specials.append(position)
+                else:
+                    literals.append((in_string, position))
+            literals.sort()
+            table = (arcs, tuple(epsilons), tuple(specials),
+                     tuple([l[0] for l in literals]), tuple([l[1] for l in literals]))
+            self._arc_tables[state] = table
+        return table
+
+    def make_arc_tables(self):
+        """Create the arc tables for all states ahead of transduction."""
+        for state in self._outgoing:
+            self.arc_table(state)
+
+    def intern_strings(self):
+        """Intern the input and output strings of all arcs."""
+        for strings in (self._in_string, self._out_string):
+            for arc, string in strings.items():
+                strings[arc] = intern_string(string)
+        self._arcs_changed()
+
+    def intern_weights(self, table=None):
+        """Parse the arc weights that are still strings, so that each distinct
+        weight is parsed only once and arcs with the same weight share one
+        object; table maps weight strings to weights and can be shared by the
+        FSTs in a cascade. Returns table."""
+        if table is None:
+            table = {}
+        if not self.is_weighted():
+            return table
+        weights = self._weight
+        parse = self._weighting.parse
+        for arc, weight in weights.items():
+            if isinstance(weight, str):
+                parsed = table.get(weight)
+                if parsed is None:
+                    parsed = table[weight] = parse(weight)
+                weights[arc] = parsed
+        return table
+
+    def input_arcs(self, state, char):
+        """The outgoing arcs from state, in their original order, whose input
+        strings could match char, the next input character (None at the end of
+        the input): epsilon arcs, arcs for char itself, for stringsets containing
+        char, and for the unknown character. Arcs that can't match are never tried
+        in transduction, so states with many outgoing arcs are cheap to leave."""
+        arcs = self._input_arcs.get((state, char))
+        if arcs is None:
+            all_arcs, positions, specials, in_strings, in_positions = self.arc_table(state)
+            if char is not None and (specials or in_strings):
+                positions = list(positions)
+                # Arcs for char itself
+                start = bisect.bisect_left(in_strings, char)
+                end = bisect.bisect_right(in_strings, char, start)
+                positions.extend(in_positions[start:end])
+                # Arcs for stringsets containing char and for the unknown character
+                for position in specials:
+                    in_string = self._in_string[all_arcs[position]]
+                    if self._label_unknown(in_string) or char in self.stringset(in_string):
+                        positions.append(position)
+                # Restore the original order of the arcs
+                positions.sort()
+            arcs = tuple([all_arcs[position] for position in positions])
+            self._input_arcs[(state, char)] = arcs
+        return arcs
+
     def step_transduce(self, input, step=True, all_paths=True, init_weight=None,
                        trace=0, tracefeat=''):
         """
@@ -2494,7 +2996,11 @@ class FST:
                         if trace > 1: print('  weight:', accum_weight)
 
                 # Get a list of arcs we can possibly take.
-                arcs = self.outgoing(state)
+                if trace:
+                    # Show all of them
+                    arcs = self.outgoing(state)
+                else:
+                    arcs = self.input_arcs(state, input[in_pos] if in_pos < len(input) else None)
 
                 # Add the arcs to our backtracking stack.
                 if trace:
@@ -2657,16 +3163,22 @@ class FST:
 
     @staticmethod
     def compose(fsts, label='', relabel=True, trace=0):
-        """Compose a list of FSTs."""
-        weighting = fsts[0].weighting()
-        for f in fsts[1:]:
-            if f.weighting() != weighting:
-                raise ValueError("%s has different weighting from %s" % (f.label, fsts[0].label))
-        if len(fsts) > 2:
-            comp1 = functools.reduce(lambda f1, f2: FST.compose2(f1, f2, trace=trace, relabel=False), fsts[:-1])
-            return FST.compose2(comp1, fsts[-1], label=label, relabel=False, trace=trace)
-        else:
-            return FST.compose2(fsts[0], fsts[1], label=label, relabel=False, trace=trace)
+        """Compose a list (or other iterable) of FSTs."""
+        fsts = iter(fsts)
+        fst0 = comp = next(fsts)
+        weighting = fst0.weighting()
+        fst2 = next(fsts, None)
+        if fst2 is None:
+            # Nothing to compose with
+            return fst0
+        for f in fsts:
+            if fst2.weighting() != weighting:
+                raise ValueError("%s has different weighting from %s" % (fst2.label, fst0.label))
+            comp = FST.compose2(comp, fst2, trace=trace, relabel=False)
+            fst2 = f
+        if fst2.weighting() != weighting:
+            raise ValueError("%s has different weighting from %s" % (fst2.label, fst0.label))
+        return FST.compose2(comp, fst2, label=label, relabel=False, trace=trace)
 
     @staticmethod
     def compose2(fst1, fst2, label='', relabel=False, trace=0):
@@ -2911,6 +3423,7 @@ class FST:
             elif self.out_string(arc) == '':
                 self._out_string[arc] = new_label
         self._sigma.add(new_label)
+        self._arcs_changed()
 
     def _any_ep(self, input_side = True):
         """Are there any epsilons on the input(outside) side of the arcs?"""
@@ -28,6 +28,7 @@ DATA_DIR = os.path.dirname(__file__)
 
 ## AfSem segments
 VOWELS = 'aeEiIou@AOU'
+VOWEL_SET = frozenset(VOWELS)
 CONSONANTS = ["h", "l", "H", "m", "^s", "r", "s", "x", "q", "Q", "b", "t", "c",
               "^h", "n", "N", "'", "k", "K", "w", "`", "z", "Z", "y", "d", "j", "g",
               "T", "C", "P", "S", "^S", "f", "p"]
@@ -48,6 +49,20 @@ SERA_I0_RE = re.compile(r'(\s)I')
 MINE_I0_SUB = r"\1'"
 MINE_IC_RE = re.compile(r"'([^aeEiou])")
 SERA_IC_SUB = r"I\1"
+SERA_LE_RE = re.compile(r"(['`hH])e")
+MINE_LA_SUB = r"\1a"
+## Amharic alternate consonants: ^h, ^s, ^S -> h, s, S; ` -> '
+SERA_ALT_RE = re.compile(r"\^(?=[hsS])|`")
+SERA_ALT_SUB = {'^': '', '`': "'"}
+## Characters that some rule applies to, for skipping text that needs no conversion
+MINE_CHARS = frozenset("'_")
+SERA_CHARS = VOWEL_SET | frozenset("^`")
+
+## Tables for simplifying alternate consonants
+SIMP_TRANS = str.maketrans({'^': None})
+SIMP_AM_TRANS = str.maketrans({'^': None, 'H': 'h', '`': "'"})
+# K -> h, except in Ke
+SIMP_K_RE = re.compile(r'K(?!e)')
 
 # Punctuation to preserve in Geez->SERA->Geez translation
 KEEP_PUNC = ",."
@@ -55,6 +70,9 @@ KEEP_PUNC = ",."
 # Special Geez characters
 GEEZ_PUNCTUATION = "፡።፣፤፥፦፧፨"
 GEEZ_NUMERALS = "፩፪፫፬፭፮፯፰፱፲፳፴፵፶፷፸፹፺፻፼"
+GEEZ_NUM_RE = re.compile('[' + GEEZ_NUMERALS + ']')
+# Geez block (U+1200-U+137C)
+GEEZ_RE = re.compile('[\u1200-\u137C]')
 
 ## Geez consonants and vowels in traditional order
 GEEZ_ALPHA_CONSONANTS = ['h', 'l', 'H', 'm', '^s', 'r', 's', 'x', 'q', 'Q', 'b',
@@ -100,17 +118,14 @@ def no_convert(form):
 
 def is_geez_num(form):
     '''Is form a Geez numeral?'''
-    return set(form) & set(GEEZ_NUMERALS)
+    return GEEZ_NUM_RE.search(form) is not None
 
 def is_geez(form):
     '''Are any of the chars in form Geez?
 
     form must be UTF8 decoded.
     '''
-    for char in form:
-        if 4608 <= ord(char) <= 4988:
-            return True
-    return False
+    return GEEZ_RE.search(form) is not None
 
 def read_conv(filename, simple=False):
     '''Create translation tables (dict), using simple conversions if simple.'''
@@ -138,55 +153,40 @@ def read_conv(filename, simple=False):
                 seg2syl[seg] = syl
     return syl2seg, seg2syl
 
+## Regular expressions for segmenting SERA into the units that are
+## converted to Geez characters: a consonant (1 or 2 roman characters)
+## with an optional vowel (2 vowels for long Silte vowels)
+_V = '[' + re.escape(VOWELS) + ']'
+SERA_SEG_RE = re.compile(r'.%s|.W%s?|\^.%s?|.' % (_V, _V, _V), re.S)
+SERA_SEG_SIL_RE = re.compile(r'.%s%s?|.W%s?|\^.%s?|.' % (_V, _V, _V, _V), re.S)
+# Words in SERA text
+WORD_RE = re.compile(r'\S+')
+# A character followed by a vowel, or a single character
+GEEZ_SEG_RE = re.compile(r'.%s|.' % _V, re.S)
+
 def sera2geez(table, form, lang='am'):
     '''Convert form in SERA to Geez, using translation table.'''
     # First delete gemination characters
     form = form.replace('_', '')
-    # Segment
-    res = ''
-    n = 0
-    nochange = False
-    while n < len(form):
-        char = form[n]
-        if n < len(form) - 1:
-            next_char = form[n + 1]
-            if next_char in VOWELS:
-                if n < len(form) - 2 and lang == 'sil' and form[n + 2] in VOWELS:
-                    # long Silte vowel
-                    trans = table.get(form[n : n + 3], char + next_char + form[n + 2])
-                    n += 1
-                else:
-                    trans = table.get(form[n : n + 2], char + next_char)
-                n += 1
-            elif next_char == 'W' or char == '^':
-                # Consonant represented by 2 roman characters
-                if n < len(form) - 2 and form[n + 2] in VOWELS:
-                    # followed by vowel
-                    trans = table.get(form[n : n + 3], char + next_char + form[n + 2])
-                    n += 1
-                    # followed by consonant
-                else:
-                    trans = table.get(form[n : n + 2], char + next_char)
-                n += 1
-            else:
-                trans = table.get(char, char)
-        else:
-            trans = table.get(char, char)
-        res += trans
-        n += 1
-    return res
+    # Segment, and convert each segment, leaving ones not in the table as they are
+    seg_re = SERA_SEG_SIL_RE if lang == 'sil' else SERA_SEG_RE
+    get = table.get
+    return ''.join([get(seg, seg) for seg in seg_re.findall(form)])
 
 def root2geez(table, root, lang='am'):
     '''Convert a verb root to Geez.'''
     # Irregular
     if root == "al_e":
         return "<አለ:>"
-    res = ROOT_LEFT
+    res = [ROOT_LEFT]
+    vowels = VOWEL_SET
+    get = table.get
+    length = len(root)
     n = 0
-    while n < len(root):
+    while n < length:
         sep = True
         char = root[n]
-        if n < len(root) - 1:
+        if n < length - 1:
             next_char = root[n + 1]
             if next_char == '|' or next_char == '_':
                 sep = False
@@ -195,25 +195,25 @@ def root2geez(table, root, lang='am'):
                 sep = False
             elif char == '_':
                 trans = ROOT_GEM
-            elif next_char in VOWELS:
-                if n < len(root) - 2 and lang == 'sil' and root[n + 2] in VOWELS:
+            elif next_char in vowels:
+                if n < length - 2 and lang == 'sil' and root[n + 2] in vowels:
                     # long Silte vowel
-                    trans = table.get(root[n : n + 3], char + next_char + root[n + 2])
+                    trans = get(root[n : n + 3], char + next_char + root[n + 2])
                     n += 1
                 else:
-                    trans = table.get(root[n : n + 2], char + next_char)
+                    trans = get(root[n : n + 2], char + next_char)
                 n += 1
                 sep = False
             elif next_char == 'W' or char == '^':
                 # Consonant represented by 2 roman characters
-                if n < len(root) - 2:
-                    if root[n + 2] in VOWELS:
+                if n < length - 2:
+                    if root[n + 2] in vowels:
                         # followed by vowel
-                        trans = table.get(root[n : n + 3], char + next_char + root[n + 2])
+                        trans = get(root[n : n + 3], char + next_char + root[n + 2])
                         n += 1
                         sep = False
                     else:
-                        trans = table.get(root[n : n + 2], char + next_char)
+                        trans = get(root[n : n + 2], char + next_char)
                         if root[n + 2] == '|':
                             n += 1
                             sep = False
@@ -221,127 +221,98 @@ def root2geez(table, root, lang='am'):
                             sep = False
                 else:
                     # Last consonant
-                    trans = table.get(root[n : n + 2], char + next_char)
+                    trans = get(root[n : n + 2], char + next_char)
                     sep = False
                 n += 1
             elif char == 'Y':
                 trans = ROOT_Y
             else:
-                trans = table.get(char, char)
+                trans = get(char, char)
         else:
             # Last consonant
             if char == 'Y':
                 trans = ROOT_Y
             else:
-                trans = table.get(char, char)
+                trans = get(char, char)
             sep = False
-        res += trans
+        res.append(trans)
         if sep:
-            res += ROOT_SEP
+            res.append(ROOT_SEP)
         n += 1        
-    return res + ROOT_RIGHT
+    res.append(ROOT_RIGHT)
+    return ''.join(res)
+
+## str.translate tables for Geez to SERA conversion tables, by id
+_TRANSLATIONS = {}
+
+def geez_translation(table):
+    '''A str.translate table for the single-character entries in the Geez to SERA table.
+
+    The table is a flat list indexed by code point, with the code point itself
+    for characters that are not converted; characters past its end are left as is.
+    '''
+    entry = _TRANSLATIONS.get(id(table))
+    if entry is None or entry[0] is not table:
+        convs = [(ord(char), seg) for char, seg in table.items() if len(char) == 1 and seg]
+        trans = list(range(max([cp for cp, seg in convs], default=-1) + 1))
+        for cp, seg in convs:
+            trans[cp] = seg
+        entry = _TRANSLATIONS[id(table)] = (table, trans)
+    return entry[1]
 
 def geez2sera(table, form, lang='am', simp=False):
     '''Convert form in Geez to SERA, using translation table.'''
     if form.isdigit():
         return form
-    res = ''
-    for char in form:
-        translation = table.get(char)
-        if translation:
-            res += translation
-#        elif char.isalpha() or char in KEEP_PUNC:
-#            # Mark the next character to remain unchanged
-#            res += u'\\' + char
-        else:
-            res += char
+    res = form.translate(geez_translation(table))
     if simp:
         res = simplify_sera(res, language=lang)
     return res
 
 def geez2sera_file(table, infile, outfile, first_out=True, simp=False):
     '''Convert forms in infile from Geez to SERA, using translation table, writing them in outfile.'''
-    inobj = open(infile)
-    outobj = open(outfile, 'a')
-    res = ''
-    for line in inobj.readlines():
-        n = 0
-        while n < len(line):
-            char = line[n]
-            if n < len(line) - 1:
-                next_char = line[n + 1]
-                if next_char in VOWELS:
-                    trans = table.get(line[n : n + 2], char + next_char)
-                    n += 1
-                else:
-                    trans = table.get(char, char)
-            else:
-                trans = table.get(char, char)
-            res += trans
-            n += 1
+    with open(infile) as inobj:
+        text = inobj.read()
+    get = table.get
+    res = ''.join([get(seg, seg) for seg in GEEZ_SEG_RE.findall(text)])
 #    if first_out:
 #        outobj.write('# -*- coding= utf-8 -*-\n\n')
-#    outobj.write(res.encode('utf8'))
-    outobj.write(res)
+    with open(outfile, 'a') as outobj:
+        outobj.write(res)
 
-def sera2geez_file(table, infile, outfile, has_encoding = False):
+def sera2geez_file(table, infile, outfile, has_encoding=False, lang='am'):
     '''Convert forms infile from SERA to Geez, using translation table, writing them in outfile.'''
-    outobj = open(outfile, 'a')
-    inobj = open(infile)
-    res = []
-    text = inobj.read()
-    lines = text.split('\n')
+    with open(infile) as inobj:
+        text = inobj.read()
     if has_encoding:
         # Leave off the lines with encoding info
-        lines = lines[2:]
-    all_res = ''
-    n_lines = 0
-    for line in lines:
-        res = ''
-        words = line.split(' ')
-        for word in words:
-            for char in word:
-                res += table.get(char, char)
-            res += ' '
-        res = res.encode('utf8')
-        if outfile:
+        text = ''.join(text.split('\n', 2)[2:])
+    # Convert each word, leaving whitespace as it is
+    res = WORD_RE.sub(lambda m: sera2geez(table, m.group(), lang=lang), text)
+    if outfile:
+        with open(outfile, 'a') as outobj:
             outobj.write(res)
-            outobj.write('\n')
-        all_res += res
-        n_lines += 1
-        if n_lines % 1000 == 0:
-            print('Transcribed', n_lines, 'lines', 'line', res)
-    inobj.close()
-    outobj.close()
 
 def simplify_sera(text, language='am'):
     '''Convert alternate consonants to the default for Amharic or Tigrinya.
     '''
-#    # Protect ^hW (not needed because ኋ, etc. converted to hW)
-#    text = text.replace('^hW', '!!!')
     # ^h -> h, ^s -> s, ^S -> S
-    text = text.replace('^', '')
-#    # Replace ^hW
-#    text = text.replace('!!!', '^hW')
-    # Amharic only: H, `, K
+    # Amharic only: H -> h, ` -> ', K -> h (except in Ke)
     if language == 'am':
-        # H -> h
-        text = text.replace('H', 'h')
-        # ` -> '
-        text = text.replace('`', "'")
-        # Protect Ke
-        text = text.replace('Ke', '!!')
-        # K -> h
-        text = text.replace('K', 'h')
-        # Replace Ke
-        text = text.replace('!!', 'Ke')
-    return text
+        text = text.translate(SIMP_AM_TRANS)
+        if 'K' in text:
+            text = SIMP_K_RE.sub('h', text)
+        return text
+    return text.translate(SIMP_TRANS)
 
 def to_real_sera(text, phon=True):
     '''Convert text from "modified" to "standard" SERA.
 
     Delete initial glottal stop before vowel; insert I if no explicit vowel. If phon, C_ -> CC.
     '''
+    if MINE_CHARS.isdisjoint(text):
+        # No glottal stops or gemination to convert
+        return text
     # Replace ' with I before consonant
     text = MINE_IC_RE.sub(SERA_IC_SUB, text)
     # Delete other glottal stops
@@ -356,10 +327,13 @@ def from_real_sera(text, phon=True, punc=True, language='am'):
     Add glottal stop before initial vowel, deleting I if it's the vowel. If phon, CC -> C_.
     VV -> V'V.
     '''
+    if not punc and SERA_CHARS.isdisjoint(text) and not (phon and SERA_GEM_RE.search(text)):
+        # No vowels, alternate consonants, or geminates to convert
+        return text
     text0 = text[0]
     if not phon and text0 == 'I':
         text = "'" + text[1:]
-    elif text0 in VOWELS:
+    elif text0 in VOWEL_SET:
         text = "'" + text
     text = SERA_V0_RE.sub(MINE_V0_SUB, text)
     text = SERA_I0_RE.sub(MINE_I0_SUB, text)
@@ -367,13 +341,13 @@ def from_real_sera(text, phon=True, punc=True, language='am'):
         text = SERA_GEM_RE.sub(SERA_GEM_SUB, text)
         if language == 'am':
             # Replace ^h, ^s, ^S, ` with h, s, S, ' but only in Amharic
-            text = text.replace('^h', 'h').replace('^s', 's').replace('^S', 'S').replace('`', "'")
+            text = SERA_ALT_RE.sub(lambda m: SERA_ALT_SUB[m.group()], text)
     # Add glottal stop between adjacent vowels
     text = SERA_VV_RE.sub(MINE_VV_SUB, text)
     # Replace I with glottal stop
     text = text.replace('I', "'")
     # Change Le to La
-    text = text.replace("'e", "'a").replace("`e", "`a").replace("he", "ha").replace("He", "Ha").replace("^he", "^ha")
+    text = SERA_LE_RE.sub(MINE_LA_SUB, text)
     # Separate punctuation
     if punc:
         text = PUNC0_RE.sub(PUNC0_SUB, text)
@@ -418,47 +392,33 @@ GEEZ_SERA = {'am': read_conv(os.path.join(DATA_DIR, 'am_conv_sera.txt')),
              'ti': read_conv(os.path.join(DATA_DIR, 'ti_conv_sera.txt')),
              'sil': read_conv(os.path.join(DATA_DIR, 'sil_conv_sera.txt'))}
 
+# Ranks of segments in Geez order, above all character codes, so that
+# other characters come first.  A consonant with no vowel after it has
+# the 6th order vowel, so consonants come between E and I.  The
+# labialization marker W comes last.
+_GEEZ_ORDER = dict([(seg, 0x110000 + rank) for rank, seg in
+                    enumerate(GEEZ_ALPHA_VOWELS[:6] + GEEZ_ALPHA_CONSONANTS +
+                              GEEZ_ALPHA_VOWELS[6:] + ['A', 'O', 'U', 'W'])])
+
+def geez_key(s):
+    """Sort key for a string or list of segments in Geez order; use it
+    as sorted(words, key=geez_key)."""
+    order = _GEEZ_ORDER
+    return tuple([order.get(seg) or (ord(seg[0]) if seg else 0) for seg in s])
+
 def geez_alpha(s1, s2, pos1 = 0, pos2 = 0):
-    """Comparator function for two strings or lists using Geez order."""
-    if s1 == s2:
-        return 0
-    elif pos1 >= len(s1):
-        return -1
-    elif pos2 >= len(s2):
-        return 1
-    else:
-        seg1 = s1[pos1]
-        seg2 = s2[pos2]
-        if seg1 == seg2:
-            return geez_alpha(s1, s2, pos1 + 1, pos2 + 1)
-        elif seg1 in VOWELS and seg2 in VOWELS:
-            if GEEZ_ALPHA_VOWELS.index(seg1) < GEEZ_ALPHA_VOWELS.index(seg2):
-                return -1
-            else:
-                return 1
-        elif seg1 == 'W':
-            return 1
-        elif seg2 == 'W':
-            return -1
-        elif seg1 in CONSONANTS and seg2 in CONSONANTS:
-            if GEEZ_ALPHA_CONSONANTS.index(seg1) < GEEZ_ALPHA_CONSONANTS.index(seg2):
-                return -1
-            else:
-                return 1
-        # Otherwise one of the vowels is a missing 6th order vowel
-        elif seg1 in CONSONANTS:
-            if seg2 in VOWELS and 5 < GEEZ_ALPHA_VOWELS.index(seg2):
-                return -1
-            else:
-                return 1
-        elif seg2 in CONSONANTS:
-            if seg1 in VOWELS:
-                if GEEZ_ALPHA_VOWELS.index(seg1) < 5:
-                    return -1
-                else:
-                    return 1
-            else:
-                return -1
-        else:
-            # Both are non-Ethiopic characters
-            return cmp(s1[pos1:], s2[pos2:])
+    """Comparator function for two strings or lists using Geez order;
+    geez_key() is faster for sorting."""
+    order = _GEEZ_ORDER
+    len1, len2 = len(s1), len(s2)
+    while pos1 < len1 and pos2 < len2:
+        seg1, seg2 = s1[pos1], s2[pos2]
+        if seg1 != seg2:
+            rank1 = order.get(seg1) or (ord(seg1[0]) if seg1 else 0)
+            rank2 = order.get(seg2) or (ord(seg2[0]) if seg2 else 0)
+            if rank1 != rank2:
+                return -1 if rank1 < rank2 else 1
+        pos1 += 1
+        pos2 += 1
+    # One is a prefix of the other
+    return (pos1 < len1) - (pos2 < len2)
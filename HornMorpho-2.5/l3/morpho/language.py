@@ -25,12 +25,15 @@ Morphology objects defined in morphology.py).
    Language.make(abbrev)
 """
 
-import os, sys, re
+import os, sys, re, functools
 
 LANGUAGE_DIR = os.path.join(os.path.dirname(__file__),
                             os.path.pardir,
                             'languages')
 
+# Number of word analyses to collect before writing them out together
+WRITE_CHUNK = 10000
+
 from .morphology import *
 # from Graphics.graphics import *
 from .anal import *
@@ -670,10 +673,6 @@ class Language:
         saved is a dict of saved analyses, to save analysis time for words occurring
         more than once.
         """
-        preproc = preproc and self.preproc
-        postproc = postproc and self.postproc
-        citation = citation and self.citation_separate
-        storedict = True if knowndict != None else False
         try:
             filein = open(pathin, 'r', encoding='utf-8')
             # If there's no output file and no outdict, write analyses to terminal
@@ -687,77 +686,108 @@ class Language:
                 fileout = open(pathout, 'w', encoding='utf-8')
                 print('Writing to', pathout)
                 out = fileout
-            fsts = pos or self.morphology.pos
-            n = 0
-            # Save words already analyzed to avoid repetition
-            saved = saved or {}
             # If nlines is not 0, keep track of lines read
             lines = filein.readlines()
             if start or nlines:
                 lines = lines[start:start+nlines]
-            for line in lines:
-                # Separate punctuation from words
-                line = self.morphology.sep_punc(line)
-                # Segment into words
-                for word in line.split():
-                    if word in saved:
-                        # Don't bother to analyze saved words
-                        analysis = saved[word]
-                    else:
-                        # If there's no point in analyzing the word (because it contains
-                        # the wrong kind of characters or whatever), don't bother.
-                        # (But only do this if preprocessing.)
-                        analysis = preproc and self.morphology.trivial_anal(word)
-                        if analysis:
-                            if raw:
-                                analysis = (word, [])
-                            else:
-#                                analysis = self.get_trans('word') + ': ' + analysis + '\n'
-                                analysis = 'word: ' + analysis + '\n'
-                        else:
-                            # Attempt to analyze the word
-                            form = word
-                            if preproc:
-                                form = self.preproc(form)
-                            analyses = self.anal_word(form, fsts=fsts, guess=guess, simplified=False,
-                                                      phon=phon, only_guess=only_guess,
-                                                      segment=segment,
-                                                      root=root, stem=True,
-                                                      citation=citation and not raw, gram=gram, 
-                                                      preproc=False, postproc=postproc and not raw,
-                                                      rank=rank, report_freq=report_freq, nbest=nbest,
-                                                      string=not raw, print_out=False,
-                                                      only_anal=storedict)
-                            if raw:
-                                analyses = (form, [(anal[0], anal[1], anal[2]) if len(anal) > 2 else (anal[0],) for anal in analyses])
-                            # If we're storing the analyses in a dict, don't convert them to a string
-                            if storedict or raw:
-                                analysis = analyses
-                            # Otherwise (for file or terminal), convert to a string
-                            else:
-                                if analyses:
-                                    # Convert the analyses to a string
-                                    analysis = self.analyses2string(word, analyses,
-                                                                    form_only=segment and not gram)
-                                else:
-#                                    analysis = '?' + self.get_trans('word') + ': ' + word + '\n'
-                                    analysis = '?word: ' + word + '\n'
-                        # Store the analyses (or lack thereof)
-                        saved[word] = analysis
-                    # Either store the analyses in the dict or write them to the terminal or the file
-                    if storedict:
-                        if analysis:
-                            add_anals_to_dict(self, analysis, knowndict, guessdict)
-                    elif raw:
-                        print(self.pretty_analyses(analysis), file=out)
-                    else:
-                        print(analysis, file=out)
+            self.anal_iter(lines, out=out, preproc=preproc, postproc=postproc, pos=pos,
+                           root=root, citation=citation, segment=segment, gram=gram,
+                           knowndict=knowndict, guessdict=guessdict, saved=saved,
+                           phon=phon, only_guess=only_guess, guess=guess, raw=raw,
+                           rank=rank, report_freq=report_freq, nbest=nbest)
             filein.close()
             if pathout:
                 fileout.close()
         except IOError:
             print('No such file or path; try another one.')
 
+    def anal_iter(self, texts, out=None, preproc=True, postproc=True, pos=None,
+                  root=True, citation=True, segment=False, gram=True,
+                  knowndict=None, guessdict=None, saved=None,
+                  phon=False, only_guess=False, guess=True, raw=False,
+                  rank=True, report_freq=True, nbest=100, tokenized=False):
+        """Analyze the words in texts, an iterable of strings (lines or tokens),
+        either writing results to out, storing in knowndict or guessdict, or printing out.
+        saved is a dict of saved analyses, to save analysis time for words occurring
+        more than once. If tokenized is True, texts are words that have already had
+        punctuation separated (see Morphology.tokenize).
+        """
+        preproc = preproc and self.preproc
+        postproc = postproc and self.postproc
+        citation = citation and self.citation_separate
+        storedict = True if knowndict != None else False
+        out = out or sys.stdout
+        fsts = pos or self.morphology.pos
+        # Save words already analyzed to avoid repetition
+        # (keep the caller's dict, even if empty, so it can be shared across files)
+        if saved is None:
+            saved = {}
+        # The options are the same for every word
+        anal_word = functools.partial(self.anal_word, fsts=fsts, guess=guess, simplified=False,
+                                      phon=phon, only_guess=only_guess,
+                                      segment=segment,
+                                      root=root, stem=True,
+                                      citation=citation and not raw, gram=gram,
+                                      preproc=False, postproc=postproc and not raw,
+                                      rank=rank, report_freq=report_freq, nbest=nbest,
+                                      string=not raw, print_out=False,
+                                      only_anal=storedict)
+        # Analyses waiting to be written to out
+        results = []
+        # Separate punctuation from words and segment into words, unless
+        # that has already been done for the whole text
+        words = texts if tokenized else self.morphology.iter_words(texts)
+        for word in words:
+            if word in saved:
+                # Don't bother to analyze saved words
+                analysis = saved[word]
+            else:
+                # If there's no point in analyzing the word (because it contains
+                # the wrong kind of characters or whatever), don't bother.
+                # (But only do this if preprocessing.)
+                analysis = preproc and self.morphology.trivial_anal(word)
+                if analysis:
+                    if raw:
+                        analysis = (word, [])
+                    else:
+#                        analysis = self.get_trans('word') + ': ' + analysis + '\n'
+                        analysis = 'word: ' + analysis + '\n'
+                else:
+                    # Attempt to analyze the word
+                    form = word
+                    if preproc:
+                        form = self.preproc(form)
+                    analyses = anal_word(form)
+                    if raw:
+                        analyses = (form, [(anal[0], anal[1], anal[2]) if len(anal) > 2 else (anal[0],) for anal in analyses])
+                    # If we're storing the analyses in a dict, don't convert them to a string
+                    if storedict or raw:
+                        analysis = analyses
+                    # Otherwise (for file or terminal), convert to a string
+                    else:
+                        if analyses:
+                            # Convert the analyses to a string
+                            analysis = self.analyses2string(word, analyses,
+                                                            form_only=segment and not gram)
+                        else:
+#                            analysis = '?' + self.get_trans('word') + ': ' + word + '\n'
+                            analysis = '?word: ' + word + '\n'
+                # Store the analyses (or lack thereof)
+                saved[word] = analysis
+            # Either store the analyses in the dict or write them to the terminal or the file
+            if storedict:
+                if analysis:
+                    add_anals_to_dict(self, analysis, knowndict, guessdict)
+            elif raw:
+                results.append(self.pretty_analyses(analysis))
+            else:
+                results.append(analysis)
+            if len(results) >= WRITE_CHUNK:
+                out.write('\n'.join(results) + '\n')
+                results = []
+        if results:
+            out.write('\n'.join(results) + '\n')
+
     def pretty_analyses(self, analyses):
         form = analyses[0]
         anals = analyses[1]
@@ -1097,54 +1127,74 @@ class Language:
             lines = filein.readlines()
             if start or nlines:
                 lines = lines[start:start+nlines]
-            begun = False
-            for line in lines:
-                # Separate punctuation from words
-                line = self.morphology.sep_punc(line)
-                # Segment into words
-                for word in line.split():
-                    if word in saved_dct:
-                        # Don't bother to analyze saved words
-                        analysis = saved_dct[word]
-                    else:
-                        # Analyze the word
-                        analysis = self.ortho2phon(word, gram=gram,
-                                                   postpostproc=postpostproc,
-                                                   raw=False, return_string=True,
-                                                   rank=rank, report_freq=report_freq, nbest=nbest)
-                        saved_dct[word] = analysis
-                    # Write the analysis to file or stdout
-                    if gram:
-                        print("{0}".format(word), file=out)
-                        for form, anal in analysis:
-                            print("-- {0}".format(form), file=out)
-                            for a in anal[1:]:
-                                for a1 in a:
-                                    print("{0}".format(a1[0]), end='', file=out)
-                        print(file=out)
-                    else:
-                        # Start with the word_sep string
-                        if begun:
-                            print(file=out, end=word_sep)
-                        if print_ortho:
-                            # Print the orthographic form
-                            print("{0} ".format(word), end='', file=out)
-                        for anal in analysis[:-1]:
-                            # Print an analysis followed by the analysis separator
-                            print("{0} ({1})".format(anal[0], anal[1]), end=anal_sep, file=out)
-                        # Print the last analysis with no analysis separator
-                        if analysis:
-                            print("{0} ({1})".format(analysis[-1][0], analysis[-1][1]), end='', file=out)
-                    begun=True
-            if not gram:
-                # Final newline
-                print(file=out)
+            self.ortho2phon_iter(lines, out=out, gram=gram,
+                                 word_sep=word_sep, anal_sep=anal_sep, print_ortho=print_ortho,
+                                 postpostproc=postpostproc,
+                                 rank=rank, report_freq=report_freq, nbest=nbest,
+                                 saved=saved_dct)
             filein.close()
             if outfile:
                 out.close()
         except IOError:
             print('No such file or path; try another one.')
 
+    def ortho2phon_iter(self, texts, out=None, gram=False,
+                        word_sep='\n', anal_sep=' ', print_ortho=True,
+                        postpostproc=False,
+                        rank=True, report_freq=True, nbest=100,
+                        saved=None, tokenized=False):
+        '''Convert the non-roman forms in texts, an iterable of strings (lines or tokens), to roman,
+        writing the results to out. See ortho2phon_file for the other parameters.
+        @param saved:    dictionary of words already converted
+        @type  saved:    dict
+        @param tokenized: whether texts are words with punctuation already separated
+        @type  tokenized: boolean
+        '''
+        out = out or sys.stdout
+        if saved is None:
+            saved = {}
+        begun = False
+        # Separate punctuation from words and segment into words, unless
+        # that has already been done for the whole text
+        words = texts if tokenized else self.morphology.iter_words(texts)
+        for word in words:
+            if word in saved:
+                # Don't bother to analyze saved words
+                analysis = saved[word]
+            else:
+                # Analyze the word
+                analysis = self.ortho2phon(word, gram=gram,
+                                           postpostproc=postpostproc,
+                                           raw=False, return_string=True,
+                                           rank=rank, report_freq=report_freq, nbest=nbest)
+                saved[word] = analysis
+            # Write the analysis to file or stdout
+            if gram:
+                print("{0}".format(word), file=out)
+                for form, anal in analysis:
+                    print("-- {0}".format(form), file=out)
+                    for a in anal[1:]:
+                        for a1 in a:
+                            print("{0}".format(a1[0]), end='', file=out)
+                print(file=out)
+            else:
+                # Start with the word_sep string
+                if begun:
+                    print(file=out, end=word_sep)
+                if print_ortho:
+                    # Print the orthographic form
+                    print("{0} ".format(word), end='', file=out)
+                for anal in analysis[:-1]:
+                    # Print an analysis followed by the analysis separator
+                    print("{0} ({1})".format(anal[0], anal[1]), end=anal_sep, file=out)
+                # Print the last analysis with no analysis separator
+                if analysis:
+                    print("{0} ({1})".format(analysis[-1][0], analysis[-1][1]), end='', file=out)
+            begun=True
+        if not gram:
+            # Final newline
+            print(file=out)
+
 ##class Multiling(dict):
 ##
 ##    def __init__(self, *lang_pos):
@@ -61,6 +61,10 @@ class SubstituteBindingsI:
     An interface for classes that can perform substitutions for
     variables.
     """
+
+    # No instance dict for the immutable feature values that implement this
+    __slots__ = ()
+
     def substitute_bindings(self, bindings):
         """
         @return: The object that is obtained by replacing
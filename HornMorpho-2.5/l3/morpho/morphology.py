@@ -49,6 +49,9 @@ class Morphology(dict):
 # excl_feats=None):
 # , lex_feats=None):
         dict.__init__(self)
+        # Tuples of values and items, created when needed
+        self._values_tuple = None
+        self._items_tuple = None
         if fsh:
             self.set_fsh(*fsh)
         else:
@@ -94,6 +97,56 @@ class Morphology(dict):
         # List of feat-val pair list and abbreviations
 #        self.fv_abbrevs = fv_abbrevs or []
 
+    def _pos_changed(self):
+        """The cached tuples of POSMorphology objects are out of date."""
+        self._values_tuple = None
+        self._items_tuple = None
+
+    def __setitem__(self, pos, posmorph):
+        dict.__setitem__(self, pos, posmorph)
+        self._pos_changed()
+
+    def __delitem__(self, pos):
+        dict.__delitem__(self, pos)
+        self._pos_changed()
+
+    def __ior__(self, other):
+        dict.update(self, other)
+        self._pos_changed()
+        return self
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._pos_changed()
+
+    def setdefault(self, pos, posmorph=None):
+        self._pos_changed()
+        return dict.setdefault(self, pos, posmorph)
+
+    def pop(self, pos, *default):
+        self._pos_changed()
+        return dict.pop(self, pos, *default)
+
+    def popitem(self):
+        self._pos_changed()
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self._pos_changed()
+
+    def values_tuple(self):
+        """The POSMorphology objects, as a tuple that's only recreated when a POS changes."""
+        if self._values_tuple is None:
+            self._values_tuple = tuple(self.values())
+        return self._values_tuple
+
+    def items_tuple(self):
+        """The (POS, POSMorphology) pairs, as a tuple that's only recreated when a POS changes."""
+        if self._items_tuple is None:
+            self._items_tuple = tuple(self.items())
+        return self._items_tuple
+
     def get_cas_dir(self):
         return os.path.join(self.directory, 'cas')
 
@@ -121,6 +174,16 @@ class Morphology(dict):
         text = self.punc_before_re.sub(self.punc_sub, text)
         return text
 
+    def tokenize(self, text):
+        """Separate punctuation from words in text and return a list of the words.
+        text can be a whole file: each regex is run once over all of it."""
+        return self.sep_punc(text).split()
+
+    def iter_words(self, texts):
+        """Iterate over the words in texts, an iterable of strings (lines or tokens)."""
+        for text in texts:
+            yield from self.tokenize(text)
+
     def is_word(self, word, simple=False, ortho=True):
         """Is word an unanalyzable word?"""
         if ortho and word in self.punctuation:
@@ -558,10 +621,11 @@ class POSMorphology:
                  create_weights=False, guess=False,
                  simplified=False, phon=False, segment=False,
                  invert=False, compose_backwards=True,
-                 relabel=True, verbose=False):
+                 relabel=True, minimal=False, verbose=False):
         '''Load FST; if compose is False, search for saved FST in file and use that if it exists.
 
-        If guess is true, create the lexiconless guesser FST.'''
+        If guess is true, create the lexiconless guesser FST.
+        If minimal is true, minimize lexicon FSTs when (re)creating the cascade.'''
         fst = None
         name = self.fst_name(generate, guess, simplified, phon=phon, segment=segment)
         path = os.path.join(self.morphology.get_cas_dir(), name + '.cas')
@@ -603,7 +667,7 @@ class POSMorphology:
                                             seg_units=self.morphology.seg_units,
                                             create_networks=True, subcasc=subcasc,
                                             language=self.language,
-                                            verbose=verbose)
+                                            minimal=minimal, verbose=verbose)
                 if self.morphology.fsh:
                     self.casc.set_init_weight(FeatStruct('[' + self.type + ']', fsh=self.morphology.fsh))
                 self.casc_inv = self.casc.inverted()
@@ -1,7 +1,6 @@
 import re, os
 from .utils import segment
-from .semiring import FSSet, UNIFICATION_SR, TOPFSS
-from .fs import FeatStructParser
+from .semiring import FSSet, UNIFICATION_SR, TOPFSS, FS_PARSER
 
 # Default name for final state
 DFLT_FINAL = 'fin'
@@ -108,7 +107,7 @@ class MTax:
             if m:
                 indentation, fs = m.groups()
                 # a FeatStruct, not a FSSet
-                weight = FeatStructParser().parse(fs)
+                weight = FS_PARSER.parse(fs)
                 current_fs = weight
                 current_indent = len(indentation)
                 continue
@@ -151,7 +150,7 @@ class MTax:
             
             raise ValueError("bad line: %r" % line)
 
-    def compile(self, verbose=False):
+    def compile(self, minimal=False, verbose=False):
 
         # Create a final state
         final_label = DFLT_FINAL
@@ -173,11 +172,12 @@ class MTax:
                     if not fst1:
                         if verbose:
                             print('Creating FST from lex file', in_string)
-                        fst1 = self.fst.load(os.path.join(self.cascade.get_lex_dir(), in_string),
+                        path = os.path.join(self.cascade.get_lex_dir(), in_string)
+                        fst1 = self.fst.load(path,
 # os.path.join(self.directory, in_string),
                                              weighting=self.weighting, cascade=self.cascade,
                                              seg_units=self.seg_units,
-                                             lex_features=True, dest_lex=False)
+                                             lex_features=True, dest_lex=False, minimal=minimal)
                     if verbose:
                         print('Inserting', fst1.label, 'between', src, 'and', dest)
                     self.fst.insert(fst1, src, dest, weight=weight, mult_dsts=False)
@@ -194,11 +194,12 @@ class MTax:
                     label = wt_file.split('.')[0]
                     fst1 = self.cascade.get(label) if self.cascade else None
                     if not fst1:
-                        fst1 = self.fst.load(os.path.join(self.cascade.get_lex_dir(), wt_file),
+                        path = os.path.join(self.cascade.get_lex_dir(), wt_file)
+                        fst1 = self.fst.load(path,
 # os.path.join(self.directory, wt_file),
                                              weighting=self.weighting, cascade=self.cascade,
                                              seg_units=self.seg_units,
-                                             lex_features=True, dest_lex=False)
+                                             lex_features=True, dest_lex=False, minimal=minimal)
                     if verbose:
                         print('Inserting', fst1.label, 'between', src, 'and', dest)
                     self.fst.insert(fst1, src, dest, weight=TOPFSS, mult_dsts=False)
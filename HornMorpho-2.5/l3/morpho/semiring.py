@@ -28,6 +28,7 @@ Author: Michael Gasser <gasser@cs.indiana.edu>
   feat=val1|val2
 """
 from .fs import *
+from .fs import _FAIL
 from .utils import *
 # import re
 
@@ -47,15 +48,24 @@ SIMP_FVAL_RE = re.compile(r'([+-]{1,2}\w+?|\w+?\s*=\s*[^\]]+?)(?:,|\]|$)')
 # feat = [...]
 COMP_FVAL_RE = re.compile(r'(\w+?\s*=\s*\[.+?\])')
 
+## One parser for all FS strings; parsing doesn't change its state
+FS_PARSER = FeatStructParser()
+## FSSet weights already parsed from strings (emptied when it has more than
+## PARSED_FSS_SIZE, and by l3.clear_caches())
+PARSED_FSS = {}
+PARSED_FSS_SIZE = 100000
+
 class FSSet(set):
     """Sets of feature structures."""
 
+    __slots__ = ()
+
     def __init__(self, *items):
         '''Create a feature structure set from items, normally a list of feature structures or strings.'''
         # This is needed for unpickling, when items is a tuple of a list of FeatStructs
         if len(items) > 0 and isinstance(items[0], list):
             items = items[0]
-        items = [(FeatStructParser().parse(i) if (isinstance(i, str) or isinstance(i, str)) else i) for i in items]
+        items = [(FS_PARSER.parse(i) if (isinstance(i, str) or isinstance(i, str)) else i) for i in items]
         # Freeze each feature structure
         for index, itm in enumerate(items):
             if isinstance(itm, FeatStruct):
@@ -98,7 +108,7 @@ class FSSet(set):
             return TOPFSS
         else:
             # Get rid of all instances of TOP and unification failures
-            return FSSet(*filter(lambda x: x != 'fail', result1))
+            return FSSet(*filter(lambda x: x is not _FAIL, result1))
 
     def inherit(self):
         """Inherit feature values for all members of set, returning new set."""
@@ -254,7 +264,14 @@ class Semiring:
             # Default weight for this SR
             return self.one
         elif self == UNIFICATION_SR:
-            return FSSet.parse(s)
+            # The same weight strings recur throughout the lexicons and rules
+            # of a language, so parse each only once; weights aren't modified
+            fss = PARSED_FSS.get(s)
+            if fss is None:
+                if len(PARSED_FSS) >= PARSED_FSS_SIZE:
+                    PARSED_FSS.clear()
+                fss = PARSED_FSS[s] = FSSet.parse(s)
+            return fss
         else:
             # Number
             return float(s)
@@ -60,15 +60,18 @@ def vb_get_citation(root, fs, simplified=False, guess=False, vc_as=False):
             result = citation[0][0]
     return result
 
+# Character replacements and deletions for simplify() and orthographize(),
+# made in one pass
+_SIMPLIFY_TABLE = str.maketrans({"`": "'", 'H': 'h', '^': None, '_': None})
+_ORTHOGRAPHIZE_TABLE = str.maketrans('', '', '_I')
+
 def simplify(word):
     """Simplify Tigrinya orthography."""
-    word = word.replace("`", "'").replace('H', 'h').replace('^', '').replace('_', '')
-    return word
+    return word.translate(_SIMPLIFY_TABLE)
 
 def orthographize(word):
     '''Convert phonological romanization to orthographic.'''
-    word = word.replace('_', '').replace('I', '')
-    return word
+    return word.translate(_ORTHOGRAPHIZE_TABLE)
 
 def cop_anal2string(anal):
     '''Convert a copula analysis to a string.
@@ -0,0 +1,26 @@
+import io
+import unittest
+
+from l3.morpho.language import Language
+from l3.morpho.morphology import Morphology
+
+class AnalIterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.morph = Morphology(punctuation=r'[.,!?]')
+        self.lang = Language(label='Test', abbrev='tst')
+        self.lang.morphology = self.morph
+        self.morph.language = self.lang
+
+    def test_iter_words(self):
+        self.assertEqual(list(self.morph.iter_words(['a b.', 'c'])),
+                         ['a', 'b', '.', 'c'])
+
+    def test_anal_iter_untokenized(self):
+        out = io.StringIO()
+        self.lang.anal_iter(['a b.', 'c'], out=out)
+        self.assertEqual(out.getvalue(),
+                         '?word: a\n\n?word: b\n\nword: .\n\n?word: c\n\n')
+
+if __name__ == '__main__':
+    unittest.main()